@@ -0,0 +1,47 @@
+# apps/client/availability.py
+"""
+"Who is free on date X" for the worker directory.
+
+A worker is available on a day when their calendar marks it 'free' and at
+least one bookable hour has no job yet — the same rule AvailableTimeSlotsView
+applies to a single worker. Both checks are correlated subqueries, so the
+whole directory page is still one query.
+"""
+from datetime import time
+
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from apps.worker.models import WorkerAvailability, WorkerJob
+
+BOOKING_HOURS = range(8, 20)  # 8 AM to 7 PM
+BOOKING_TIMES = [time(hour, 0) for hour in BOOKING_HOURS]
+MAX_SEARCH_DAYS = 31
+# How far ahead clients can book (WorkerBookingInfoView's calendar)
+BOOKING_WINDOW_DAYS = 60
+
+
+def open_days(start, end):
+    """Free calendar days in [start, end] that still have an unbooked slot, per OuterRef('user_id')"""
+    booked = WorkerJob.objects.filter(
+        worker=OuterRef('worker'), date=OuterRef('date'), time__in=BOOKING_TIMES,
+    ).order_by().values('worker').annotate(
+        slots=Count('time', distinct=True)
+    ).values('slots')
+
+    return WorkerAvailability.objects.filter(
+        worker=OuterRef('user_id'), status='free', date__range=(start, end),
+    ).annotate(
+        booked=Coalesce(Subquery(booked, output_field=IntegerField()), Value(0))
+    ).filter(booked__lt=len(BOOKING_TIMES))
+
+
+def available_between(queryset, start, end):
+    """
+    WorkerProfiles with an open day in [start, end], annotated with the
+    first one as `available_date`.
+    """
+    days = open_days(start, end)
+    return queryset.filter(Exists(days)).annotate(
+        available_date=Subquery(days.order_by('date').values('date')[:1])
+    )
@@ -0,0 +1,94 @@
+# apps/client/pagination.py
+"""
+Keyset pagination for the worker directory.
+
+Each sort walks one (profession, <sort key>, id) index on WorkerProfile;
+the cursor is "<sort key value>:<id>" of the last worker on the page, so
+page N costs the same as page 1 however deep the client scrolls.
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def _from_micros(value):
+    return EPOCH + int(value) * MICROSECOND
+
+
+def _finite_decimal(value):
+    value = Decimal(value)
+    if not value.is_finite():
+        # NaN / Infinity parse, but the queryset filter rejects them
+        raise ValueError(value)
+    return value
+
+
+def _finite_float(value):
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(value)
+    return value
+
+
+# sort name → (field, descending, cursor value parser)
+SORTS = {
+    'rating': ('rating', True, _finite_decimal),
+    'hourly_rate': ('hourly_rate', False, _finite_decimal),
+    'experience_years': ('experience_years', True, int),
+    'newest': ('created_at', True, _from_micros),
+    # Only with ?lat=&lng= — `distance` is annotated by the nearby search
+    'distance': ('distance', False, _finite_float),
+}
+DEFAULT_SORT = 'rating'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _cursor_value(value):
+    if isinstance(value, datetime):
+        # Microseconds — exact, and no ':' to confuse the separator
+        return str((value - EPOCH) // MICROSECOND)
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def encode_cursor(sort, profile):
+    field = SORTS[sort][0]
+    return f"{_cursor_value(getattr(profile, field))}:{profile.id}"
+
+
+def decode_cursor(sort, cursor):
+    try:
+        value, profile_id = cursor.rsplit(':', 1)
+        return SORTS[sort][2](value), int(profile_id)
+    except (AttributeError, ValueError, InvalidOperation, OverflowError):
+        raise InvalidCursor(cursor)
+
+
+def paginate_workers(queryset, sort=DEFAULT_SORT, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Returns (profiles, next_cursor); next_cursor is None on the last page"""
+    field, descending, _ = SORTS[sort]
+    if cursor:
+        value, profile_id = decode_cursor(sort, cursor)
+        if descending:
+            queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': profile_id}))
+        else:
+            queryset = queryset.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': profile_id}))
+
+    order = [f'-{field}', '-id'] if descending else [field, 'id']
+    page = list(queryset.order_by(*order)[:limit + 1])
+    if len(page) <= limit:
+        return page, None
+    page = page[:limit]
+    return page, encode_cursor(sort, page[-1])
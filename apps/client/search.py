@@ -0,0 +1,62 @@
+# apps/client/search.py
+"""
+Worker search over name, profession and skills.
+
+WorkerProfile.search_document holds the lower-cased text. Every query word
+must appear in it (LIKE '%word%'), which on Postgres is answered by the
+trigram GIN index from users migration 0007; results are ranked by
+word_similarity. Elsewhere (SQLite in dev) the same filter scans, and the
+rank only prefers name matches.
+
+Pagination is keyset on (rank, id), cursor "rank:id" (apps/users/search_cursor.py).
+"""
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Case, FloatField, Q, Value, When
+from django.db.models.functions import Cast
+
+from apps.users.models import WorkerProfile
+from apps.users.search_cursor import decode_cursor, encode_cursor
+
+DEFAULT_RESULTS = 20
+MAX_RESULTS = 50
+MIN_QUERY_LENGTH = 2
+MAX_QUERY_TERMS = 5
+
+
+def search_workers(query, profession=None, cursor=None, limit=DEFAULT_RESULTS):
+    """
+    Returns (profiles, next_cursor). Each profile carries a `rank`
+    annotation; next_cursor is None on the last page.
+    """
+    query = ' '.join(query.lower().split()[:MAX_QUERY_TERMS])
+    profiles = WorkerProfile.objects.filter(user__is_active=True)
+    if profession:
+        profiles = profiles.filter(profession=profession)
+    for term in query.split():
+        profiles = profiles.filter(search_document__contains=term)
+
+    if connection.vendor == 'postgresql':
+        # word_similarity is float4; as float8 the value round-trips through
+        # the cursor exactly, so rank equality on the next page still matches
+        profiles = profiles.annotate(
+            rank=Cast(TrigramWordSimilarity(query, 'search_document'), FloatField())
+        )
+    else:
+        # The document starts with the name
+        profiles = profiles.annotate(rank=Case(
+            When(search_document__startswith=query, then=Value(1.0)),
+            When(search_document__contains=f' {query}', then=Value(0.5)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ))
+
+    if cursor:
+        rank, profile_id = decode_cursor(cursor)
+        profiles = profiles.filter(Q(rank__lt=rank) | Q(rank=rank, id__lt=profile_id))
+
+    page = list(profiles.select_related('user').order_by('-rank', '-id')[:limit + 1])
+    if len(page) <= limit:
+        return page, None
+    page = page[:limit]
+    return page, encode_cursor(page[-1].rank, page[-1].id)
@@ -0,0 +1,183 @@
+# apps/client/tests.py
+import math
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.users import geo
+from apps.users.models import WorkerProfile
+from apps.worker.models import WorkerAvailability, WorkerJob
+
+from .availability import BOOKING_TIMES, BOOKING_WINDOW_DAYS
+
+User = get_user_model()
+
+
+def make_worker(username, profession='moving', **profile):
+    user = User.objects.create_user(
+        username=username, email=f"{username}@example.com", password='x',
+        user_type='worker', full_name=username.title(),
+    )
+    defaults = {'hourly_rate': 20, 'experience_years': 1}
+    defaults.update(profile)
+    if defaults.get('latitude') is not None:
+        defaults['geohash'] = geo.encode(defaults['latitude'], defaults['longitude'])
+    return WorkerProfile.objects.create(user=user, profession=profession, **defaults)
+
+
+class WorkerDirectoryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('workers-by-profession')
+
+    def test_every_sort_pages_through_all_workers(self):
+        profiles = [
+            make_worker(f"mover{i}", hourly_rate=15 + i % 3, experience_years=i % 4, rating=f"{i % 2 * 4}.50")
+            for i in range(9)
+        ]
+        for sort in ('rating', 'hourly_rate', 'experience_years', 'newest'):
+            seen, cursor = [], None
+            while True:
+                params = {'profession': 'moving', 'sort': sort, 'limit': 2}
+                if cursor:
+                    params['cursor'] = cursor
+                with self.assertNumQueries(1):
+                    data = self.client.get(self.url, params).data
+                seen += [worker['id'] for worker in data['workers']]
+                cursor = data['next_cursor']
+                if not cursor:
+                    break
+            self.assertEqual(sorted(seen), sorted(p.user_id for p in profiles), sort)
+
+    def test_non_finite_cursor_is_a_bad_request(self):
+        make_worker('mover')
+        for sort, cursor in (('rating', 'NaN:1'), ('rating', 'Infinity:1'), ('hourly_rate', 'sNaN:1')):
+            response = self.client.get(self.url, {'profession': 'moving', 'sort': sort, 'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+
+    def test_date_filter_finds_workers_with_an_open_slot(self):
+        tomorrow = timezone.now().date() + timedelta(days=1)
+        free, full, busy = (make_worker(name) for name in ('free', 'full', 'busy'))
+        for profile in (free, full):
+            WorkerAvailability.objects.create(worker=profile.user, date=tomorrow, status='free')
+        WorkerAvailability.objects.create(worker=busy.user, date=tomorrow, status='job')
+        WorkerJob.objects.bulk_create([
+            WorkerJob(worker=full.user, client=free.user, date=tomorrow, time=slot) for slot in BOOKING_TIMES
+        ])
+
+        with self.assertNumQueries(1):
+            data = self.client.get(self.url, {'profession': 'moving', 'date': str(tomorrow)}).data
+        self.assertEqual([worker['id'] for worker in data['workers']], [free.user_id])
+
+    def test_date_filter_is_limited_to_the_booking_window(self):
+        today = timezone.now().date()
+        for params in (
+            {'date': str(today - timedelta(days=1))},
+            {'date_from': str(today - timedelta(days=3)), 'date_to': str(today)},
+            {'date': str(today + timedelta(days=BOOKING_WINDOW_DAYS + 1))},
+        ):
+            response = self.client.get(self.url, {'profession': 'moving', **params})
+            self.assertEqual(response.status_code, 400, params)
+        response = self.client.get(self.url, {'profession': 'moving', 'date': str(today)})
+        self.assertEqual(response.status_code, 200)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    half_chord = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * geo.EARTH_RADIUS_KM * math.asin(math.sqrt(half_chord))
+
+
+class NearbyWorkerTests(TestCase):
+    # Lagos; a 1° box around it spans several precision-4/5 cell edges
+    CENTRE = (6.5244, 3.3792)
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(23)
+        cls.profiles = [
+            make_worker(
+                f"mover{i}",
+                latitude=cls.CENTRE[0] + rng.uniform(-0.5, 0.5),
+                longitude=cls.CENTRE[1] + rng.uniform(-0.5, 0.5),
+            )
+            for i in range(40)
+        ]
+        make_worker('nowhere')  # no coordinates, never "nearby"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('workers-by-profession')
+
+    def within(self, radius_km):
+        return {
+            profile.user_id for profile in self.profiles
+            if haversine_km(*self.CENTRE, profile.latitude, profile.longitude) <= radius_km
+        }
+
+    def test_radius_matches_brute_force(self):
+        for radius_km in (15, 25, 60):
+            params = {'profession': 'moving', 'lat': self.CENTRE[0], 'lng': self.CENTRE[1],
+                      'radius_km': radius_km, 'limit': 50}
+            data = self.client.get(self.url, params).data
+            self.assertTrue(self.within(radius_km), radius_km)
+            self.assertEqual({worker['id'] for worker in data['workers']}, self.within(radius_km), radius_km)
+
+    def test_distance_sort_pages_nearest_first(self):
+        distances, cursor = [], None
+        while True:
+            params = {'profession': 'moving', 'lat': self.CENTRE[0], 'lng': self.CENTRE[1],
+                      'radius_km': 40, 'limit': 3}
+            if cursor:
+                params['cursor'] = cursor
+            with self.assertNumQueries(1):
+                data = self.client.get(self.url, params).data
+            distances += [(worker['distance_km'], worker['id']) for worker in data['workers']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual({worker_id for _, worker_id in distances}, self.within(40))
+        self.assertEqual(len(distances), len(self.within(40)))
+        self.assertEqual([d for d, _ in distances], sorted(d for d, _ in distances))
+
+    def test_distance_sort_needs_coordinates(self):
+        response = self.client.get(self.url, {'profession': 'moving', 'sort': 'distance'})
+        self.assertEqual(response.status_code, 400)
+
+
+class WorkerSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('worker-search')
+
+    def test_pages_across_equal_ranks(self):
+        # Same document shape → equal rank (word_similarity on Postgres)
+        profiles = [make_worker(f"tiler{i}", 'handyman', skills=['Tiling']) for i in range(7)]
+        seen, cursor = [], None
+        while True:
+            params = {'q': 'tiling', 'limit': 2}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.client.get(self.url, params).data
+            seen += [worker['id'] for worker in data['workers']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(sorted(seen), sorted(p.user_id for p in profiles))
+
+    def test_name_change_updates_search_document(self):
+        profile = make_worker('maria', 'cleaning')
+        profile.user.full_name = 'Maria Lopez'
+        profile.user.save(update_fields=['full_name'])
+        data = self.client.get(self.url, {'q': 'lopez', 'profession': 'cleaning'}).data
+        self.assertEqual([worker['id'] for worker in data['workers']], [profile.user_id])
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        for cursor in ('x', 'nan:1', '1.0'):
+            response = self.client.get(self.url, {'q': 'tiling', 'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
@@ -1,10 +1,11 @@
 # apps/client/urls.py
 from django.urls import path
-from .views import PopularServicesView, WorkersByProfessionView, ContractorProfileView, WorkerBookingInfoView, AvailableTimeSlotsView, CreateBookingView, ClientMyBookingsView, ClientViewInvoiceView, MarkAsPaidView, ClientReviewWorkerView  
+from .views import PopularServicesView, WorkersByProfessionView, WorkerSearchView, ContractorProfileView, WorkerBookingInfoView, AvailableTimeSlotsView, CreateBookingView, ClientMyBookingsView, ClientViewInvoiceView, MarkAsPaidView, ClientReviewWorkerView  
 
 urlpatterns = [
     path('services/popular/', PopularServicesView.as_view(), name='popular-services'),
     path('workers/', WorkersByProfessionView.as_view(), name='workers-by-profession'),
+    path('workers/search/', WorkerSearchView.as_view(), name='worker-search'),
     path('worker/<int:worker_id>/', ContractorProfileView.as_view(), name='contractor-profile'),
     path('worker/<int:worker_id>/booking-info/', WorkerBookingInfoView.as_view(), name='booking-info'),
     path('worker/<int:worker_id>/time-slots/', AvailableTimeSlotsView.as_view(), name='time-slots'),
@@ -1,21 +1,54 @@
 # apps/client/views.py
-from django.db import models
+from django.db import transaction
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.db.models import Count, Q, Avg
-from datetime import datetime, time, timedelta
+from django.db.models import Count, Q
+from datetime import datetime, timedelta
+from .availability import BOOKING_TIMES, BOOKING_WINDOW_DAYS, MAX_SEARCH_DAYS, available_between
+from .pagination import DEFAULT_PAGE_SIZE, DEFAULT_SORT, MAX_PAGE_SIZE, SORTS, InvalidCursor, paginate_workers
+from .search import DEFAULT_RESULTS, MAX_RESULTS, MIN_QUERY_LENGTH, search_workers
 from .serializers import ClientBookingCardSerializer
+from apps.messaging.pagination import parse_limit
 from decimal import Decimal
 import random
 import string
 from apps.worker.models import WorkerAvailability, WorkerJob, Invoice, Review
+from apps.users import geo
 from apps.users.models import WorkerProfile
+from apps.users.search_cursor import InvalidSearchCursor
 
 User = get_user_model()
 
+# Nearby search (?lat=&lng=&radius_km=)
+DEFAULT_RADIUS_KM = 25
+MAX_RADIUS_KM = 200
+
+
+def worker_card(profile):
+    """Directory / search result entry for a profile (user selected)"""
+    user = profile.user
+    return {
+        "id": user.id,
+        "full_name": user.full_name or "No Name",
+        "photo": user.profile_pic.url if user.profile_pic else None,
+        "profession": profile.get_profession_display(),
+        "location": user.location or "Not set",
+        "experience_years": profile.experience_years,
+        "rating": profile.display_rating(),
+        "total_reviews": profile.rating_count,
+        "hourly_rate": f"${profile.hourly_rate}",
+        "total_jobs": profile.total_jobs,
+    }
+
+
+def profile_coordinates(profile):
+    if profile.latitude is None:
+        return None
+    return {"lat": profile.latitude, "lng": profile.longitude}
+
 
 # ========================================
 # 1. POPULAR SERVICES (with worker count)
@@ -53,45 +86,151 @@ class WorkersByProfessionView(generics.ListAPIView):
         if not profession:
             return WorkerProfile.objects.none()
 
+        # Rating and job counts are stored on the profile — no aggregation
         return WorkerProfile.objects.filter(
             profession=profession,
             user__is_active=True
-        ).select_related('user').annotate(
-            avg_rating=Avg('user__reviews_received__rating'),
-            total_reviews=Count('user__reviews_received'),
-            completed_jobs=Count('user__jobs', filter=models.Q(user__jobs__status='completed'))
-        )
+        ).select_related('user')
+
+    def nearby(self, queryset, latitude, longitude, radius_km):
+        """
+        Workers within radius_km: geohash prefix ranges on the
+        (profession, geohash) index pick the candidates, then the exact
+        distance is computed for those rows only.
+        """
+        return queryset.filter(
+            geo.nearby_filter(latitude, longitude, radius_km),
+            latitude__isnull=False,
+        ).annotate(
+            distance=geo.distance_km(latitude, longitude)
+        ).filter(distance__lte=radius_km)
 
     def list(self, request, *args, **kwargs):
+        params = request.query_params
         queryset = self.get_queryset()
-        
-        if not queryset.exists():
+
+        near = None
+        if params.get('lat') is not None or params.get('lng') is not None:
+            try:
+                latitude, longitude = geo.parse_coordinates(params.get('lat'), params.get('lng'))
+                radius_km = float(params.get('radius_km', DEFAULT_RADIUS_KM))
+            except ValueError as e:
+                return Response({"success": False, "message": str(e)}, status=400)
+            if not 0 < radius_km <= MAX_RADIUS_KM:
+                return Response({
+                    "success": False,
+                    "message": f"radius_km must be between 0 and {MAX_RADIUS_KM}"
+                }, status=400)
+            near = {"lat": latitude, "lng": longitude, "radius_km": radius_km}
+            queryset = self.nearby(queryset, latitude, longitude, radius_km)
+
+        # ?date= or ?date_from=&date_to= — only workers with an open slot then
+        dates = None
+        if any(params.get(key) for key in ('date', 'date_from', 'date_to')):
+            try:
+                start = datetime.strptime(params.get('date') or params.get('date_from') or '', "%Y-%m-%d").date()
+                end = datetime.strptime(params.get('date') or params.get('date_to') or '', "%Y-%m-%d").date()
+            except ValueError:
+                return Response({
+                    "success": False,
+                    "message": "Send date, or date_from and date_to, as YYYY-MM-DD"
+                }, status=400)
+            if not 0 <= (end - start).days < MAX_SEARCH_DAYS:
+                return Response({
+                    "success": False,
+                    "message": f"date_to must be on or after date_from, at most {MAX_SEARCH_DAYS} days"
+                }, status=400)
+            today = timezone.now().date()
+            if start < today or end > today + timedelta(days=BOOKING_WINDOW_DAYS):
+                # Same window WorkerBookingInfoView offers
+                return Response({
+                    "success": False,
+                    "message": f"Dates must be between today and {BOOKING_WINDOW_DAYS} days ahead"
+                }, status=400)
+            dates = {"from": str(start), "to": str(end)}
+            queryset = available_between(queryset, start, end)
+
+        sort = params.get('sort', 'distance' if near else DEFAULT_SORT)
+        if sort not in SORTS:
+            return Response({
+                "success": False,
+                "message": f"sort must be one of: {', '.join(SORTS)}"
+            }, status=400)
+        if sort == 'distance' and not near:
+            return Response({
+                "success": False,
+                "message": "sort=distance needs lat and lng"
+            }, status=400)
+
+        # One page per request, keyset on (sort key, id)
+        try:
+            profiles, next_cursor = paginate_workers(
+                queryset,
+                sort=sort,
+                cursor=request.query_params.get('cursor'),
+                limit=parse_limit(request.query_params.get('limit'), DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE),
+            )
+        except InvalidCursor:
+            return Response({"success": False, "message": "Invalid cursor"}, status=400)
+
+        if not profiles and not request.query_params.get('cursor'):
             return Response({
                 "success": True,
                 "workers": [],
+                "next_cursor": None,
                 "message": "No workers found in this category"
             })
 
         workers = []
-        for profile in queryset:
-            user = profile.user
-            
-            workers.append({
-                "id": user.id,
-                "full_name": user.full_name or "No Name",
-                "photo": user.profile_pic.url if user.profile_pic else None, 
-                "profession": profile.get_profession_display(),
-                "location": user.location or "Not set",
-                "experience_years": profile.experience_years,
-                "rating": round(profile.avg_rating, 1) if profile.avg_rating else 0.0,
-                "total_reviews": profile.total_reviews or 0,
-                "hourly_rate": f"${profile.hourly_rate}",
-                "total_jobs": profile.completed_jobs,
-            })
+        for profile in profiles:
+            card = worker_card(profile)
+            card["distance_km"] = round(profile.distance, 1) if near else None
+            card["available_date"] = str(profile.available_date) if dates else None
+            workers.append(card)
+
+        return Response({
+            "success": True,
+            "sort": sort,
+            "near": near,
+            "dates": dates,
+            "workers": workers,
+            "next_cursor": next_cursor,   # pass as ?cursor= (same sort) for the next page
+        })
+
+
+# ========================================
+# 2b. WORKER SEARCH (name, profession, skills)
+# ========================================
+class WorkerSearchView(generics.GenericAPIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        query = (request.query_params.get('q') or '').strip()
+        if len(query) < MIN_QUERY_LENGTH:
+            return Response({
+                "success": False,
+                "message": f"q must be at least {MIN_QUERY_LENGTH} characters"
+            }, status=400)
+
+        profession = request.query_params.get('profession')
+        if profession and profession not in dict(WorkerProfile.PROFESSION_CHOICES):
+            return Response({"success": False, "message": "Unknown profession"}, status=400)
+
+        try:
+            profiles, next_cursor = search_workers(
+                query,
+                profession=profession,
+                cursor=request.query_params.get('cursor'),
+                limit=parse_limit(request.query_params.get('limit'), DEFAULT_RESULTS, MAX_RESULTS),
+            )
+        except InvalidSearchCursor:
+            return Response({"success": False, "message": "Invalid cursor"}, status=400)
 
         return Response({
             "success": True,
-            "workers": workers
+            "query": query,
+            "workers": [worker_card(profile) for profile in profiles],
+            "next_cursor": next_cursor,
         })
 
 
@@ -124,12 +263,6 @@ class ContractorProfileView(generics.GenericAPIView):
             for item in availabilities
         ]
 
-        # === TOTAL COMPLETED JOBS ONLY ===
-        total_completed_jobs = WorkerJob.objects.filter(
-            worker=worker,
-            status='completed'
-        ).count()
-
         # === REAL REVIEWS ===
         reviews = Review.objects.filter(
             reviewee=worker,
@@ -152,9 +285,10 @@ class ContractorProfileView(generics.GenericAPIView):
                 "full_name": worker.full_name or "No Name",
                 "profession": profile.get_profession_display(),
                 "profile_pic": worker.profile_pic.url if worker.profile_pic else None,
-                "location": "America",
+                "location": worker.location or "Not set",
+                "coordinates": profile_coordinates(profile),
                 "hourly_rate": str(profile.hourly_rate),
-                "total_jobs": total_completed_jobs,
+                "total_jobs": profile.total_jobs,
                 "experience_years": profile.experience_years,
                 "skills": profile.skills or []
             },
@@ -182,7 +316,7 @@ class WorkerBookingInfoView(generics.GenericAPIView):
             return Response({"success": False, "message": "Worker not found"}, status=404)
 
         today = timezone.now().date()
-        future_date = today + timedelta(days=60)
+        future_date = today + timedelta(days=BOOKING_WINDOW_DAYS)
 
         free_dates = WorkerAvailability.objects.filter(
             worker=worker,
@@ -199,7 +333,8 @@ class WorkerBookingInfoView(generics.GenericAPIView):
                 "id": worker.id,
                 "full_name": worker.full_name,
                 "profession": profile.get_profession_display(),
-                "location": "America",
+                "location": worker.location or "Not set",
+                "coordinates": profile_coordinates(profile),
                 "hourly_rate": str(profile.hourly_rate)
             },
             "available_dates": free_dates_list
@@ -233,8 +368,7 @@ class AvailableTimeSlotsView(generics.GenericAPIView):
         booked = WorkerJob.objects.filter(worker=worker, date=selected_date).values_list('time', flat=True)
 
         slots = []
-        for hour in range(8, 20):  # 8 AM to 7 PM
-            t = time(hour, 0)
+        for t in BOOKING_TIMES:
             display = t.strftime("%I:%M %p").lstrip("0").replace(" 0", " ")
             slots.append({
                 "time": str(t),       # "15:00:00"
@@ -457,18 +591,21 @@ class ClientReviewWorkerView(generics.CreateAPIView):
         except:
             return Response({"success": False, "message": "Rating must be 1-5"}, status=400)
 
-        Review.objects.create(
-            reviewer=request.user,
-            reviewee=job.worker,
-            job=job,
-            rating=rating,
-            comment=comment,
-            photo1=photo1,
-            photo2=photo2,
-            photo3=photo3,
-            photo4=photo4,
-            photo5=photo5,
-        )
+        with transaction.atomic():
+            Review.objects.create(
+                reviewer=request.user,
+                reviewee=job.worker,
+                job=job,
+                rating=rating,
+                comment=comment,
+                photo1=photo1,
+                photo2=photo2,
+                photo3=photo3,
+                photo4=photo4,
+                photo5=photo5,
+            )
+            # Keep the worker's stored rating in step with the new review
+            WorkerProfile.record_review(job.worker_id, rating)
 
         return Response({
             "success": True,
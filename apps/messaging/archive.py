@@ -0,0 +1,74 @@
+# apps/messaging/archive.py
+"""
+Cold-conversation archiving.
+
+Conversations with no message for longer than the idle threshold have their
+messages moved from the hot Message table into ArchivedMessage, which keeps
+the hot table — and its indexes — down to active chats. On Postgres the
+archive is partitioned by month; the partitions a batch needs are created
+right before it is inserted. The history endpoint reads both tables
+(pagination.paginate_messages(archive=...)).
+"""
+from datetime import datetime, timezone
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+from .models import ArchivedMessage, Conversation, Message
+
+ARCHIVE_FIELDS = (
+    'id', 'conversation_id', 'sender_id', 'content', 'created_at', 'client_msg_id',
+    'attachment_ref', 'attachment_type',
+)
+
+
+def month_start(value):
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def next_month(month):
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def ensure_partitions(created_ats):
+    """Create the monthly archive partitions covering these timestamps (Postgres only)"""
+    if connection.vendor != 'postgresql':
+        return
+    table = ArchivedMessage._meta.db_table
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for month in sorted({month_start(value) for value in created_ats}):
+            # DDL can't take bind parameters; the bounds are generated here
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {qn(f'{table}_y{month.year}m{month.month:02d}')} "
+                f"PARTITION OF {qn(table)} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+            )
+
+
+def idle_conversations(cutoff):
+    """Conversations silent since before cutoff that still have hot messages"""
+    return Conversation.objects.filter(last_message_time__lt=cutoff).filter(
+        Exists(Message.objects.filter(conversation=OuterRef('pk')))
+    )
+
+
+def archive_conversation(conversation_id, cutoff, batch_size=1000):
+    """
+    Move a conversation's messages older than cutoff into the archive, one
+    transaction per batch. Returns the number of messages moved.
+    """
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Message.objects.filter(conversation_id=conversation_id, created_at__lt=cutoff)
+                .order_by('id').values(*ARCHIVE_FIELDS)[:batch_size]
+            )
+            if not rows:
+                return moved
+            ensure_partitions(row['created_at'] for row in rows)
+            ArchivedMessage.objects.bulk_create([ArchivedMessage(**row) for row in rows])
+            Message.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        moved += len(rows)
@@ -0,0 +1,134 @@
+# apps/messaging/attachments.py
+"""
+Chat attachments uploaded straight to storage.
+
+The client asks for upload parameters (POST attachments/sign/), uploads the
+file itself to the returned URL, then sends a message carrying only
+{"attachment": {"ref": ..., "type": ...}}. File bytes never pass through
+Django or the socket server.
+
+Refs are issued under chat/<user_id>/, so a sender can only attach uploads
+that were signed for them.
+"""
+import time
+import uuid
+from dataclasses import dataclass
+
+import cloudinary
+import cloudinary.utils
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+from .models import ATTACHMENT_TYPE_CHOICES
+
+ATTACHMENT_TYPES = tuple(value for value, _ in ATTACHMENT_TYPE_CHOICES)
+# Cloudinary resource type per attachment type
+RESOURCE_TYPES = {'image': 'image', 'video': 'video', 'file': 'raw'}
+# Cloudinary rejects signed uploads whose timestamp is older than an hour
+CLOUDINARY_SIGNATURE_TTL = 3600
+LOCAL_UPLOAD_TTL = 600
+LOCAL_UPLOAD_SALT = 'messaging.attachments.local-upload'
+
+
+class InvalidAttachment(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Attachment:
+    ref: str
+    type: str
+
+
+def upload_prefix(user_id):
+    return f"chat/{user_id}/"
+
+
+def parse_attachment(data, user_id):
+    """Attachment from a send_message payload; the ref must be one issued to this user"""
+    if not isinstance(data, dict):
+        raise InvalidAttachment(data)
+    ref = str(data.get('ref') or '')
+    attachment_type = data.get('type')
+    if attachment_type not in ATTACHMENT_TYPES or len(ref) > 255:
+        raise InvalidAttachment(data)
+    if not ref.startswith(upload_prefix(user_id)) or '..' in ref:
+        raise InvalidAttachment(data)
+    return Attachment(ref=ref, type=attachment_type)
+
+
+class CloudinaryAttachmentStorage:
+    def upload_params(self, user_id, attachment_type):
+        ref = f"{upload_prefix(user_id)}{uuid.uuid4().hex}"
+        timestamp = int(time.time())
+        config = cloudinary.config()
+        fields = {"public_id": ref, "timestamp": timestamp}
+        fields["signature"] = cloudinary.utils.api_sign_request(fields, config.api_secret)
+        fields["api_key"] = config.api_key
+        return {
+            "ref": ref,
+            "type": attachment_type,
+            "method": "POST",  # multipart: these fields + "file"
+            "upload_url": cloudinary.utils.cloudinary_api_url(
+                "upload", resource_type=RESOURCE_TYPES[attachment_type]
+            ),
+            "fields": fields,
+            "expires_at": timestamp + CLOUDINARY_SIGNATURE_TTL,
+        }
+
+    def url(self, attachment):
+        return cloudinary.utils.cloudinary_url(
+            attachment.ref, resource_type=RESOURCE_TYPES[attachment.type], secure=True
+        )[0]
+
+
+class LocalAttachmentStorage:
+    """
+    Stand-in for dev and tests: a signed, short-lived upload URL served by
+    LocalAttachmentUploadView, saving into Django's default storage.
+    """
+    def upload_params(self, user_id, attachment_type):
+        ref = f"{upload_prefix(user_id)}{uuid.uuid4().hex}"
+        token = signing.dumps({"ref": ref, "type": attachment_type}, salt=LOCAL_UPLOAD_SALT)
+        return {
+            "ref": ref,
+            "type": attachment_type,
+            "method": "PUT",  # raw file bytes as the body
+            "upload_url": reverse('chat-attachment-local-upload', args=[token]),
+            "fields": {},
+            "expires_at": int(time.time()) + LOCAL_UPLOAD_TTL,
+        }
+
+    def read_token(self, token):
+        """Attachment the upload token was issued for; raises signing.BadSignature"""
+        data = signing.loads(token, salt=LOCAL_UPLOAD_SALT, max_age=LOCAL_UPLOAD_TTL)
+        return Attachment(ref=data["ref"], type=data["type"])
+
+    def exists(self, attachment):
+        return default_storage.exists(attachment.ref)
+
+    def save(self, attachment, content):
+        return default_storage.save(attachment.ref, content)
+
+    def url(self, attachment):
+        return default_storage.url(attachment.ref)
+
+
+def get_attachment_storage():
+    backend = getattr(settings, "CHAT_ATTACHMENT_BACKEND", "cloudinary")
+    if backend == "local":
+        return LocalAttachmentStorage()
+    return CloudinaryAttachmentStorage()
+
+
+attachment_storage = get_attachment_storage()
+
+
+def attachment_payload(message):
+    """{"ref", "type", "url"} for a message with an attachment, else None"""
+    if not message.attachment_ref:
+        return None
+    attachment = Attachment(ref=message.attachment_ref, type=message.attachment_type)
+    return {"ref": attachment.ref, "type": attachment.type, "url": attachment_storage.url(attachment)}
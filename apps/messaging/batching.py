@@ -0,0 +1,141 @@
+# apps/messaging/batching.py
+"""
+Write-behind batching for chat messages.
+
+send_message hands its message to a MessageBatcher instead of inserting it
+directly. The batcher collects messages for up to `max_delay` seconds (or
+until `max_size` are waiting), writes them with one bulk_create plus the
+conversation summary updates in a single transaction, and only then
+resolves each sender's await — so acks still go out after the commit.
+Each waiter also gets its conversation's per-participant updates, read once
+for the whole batch, so a batch costs the same handful of queries however
+many messages it holds.
+"""
+import asyncio
+import logging
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from apps.messaging.models import Message
+from apps.messaging.sync import batch_conversation_updates
+
+logger = logging.getLogger(__name__)
+
+
+def _record(messages):
+    by_conversation = {}
+    for message in messages:
+        by_conversation.setdefault(message.conversation_id, []).append(message)
+    for conversation_messages in by_conversation.values():
+        conversation_messages[0].conversation.record_messages(conversation_messages)
+
+
+@database_sync_to_async
+def persist_batch(messages):
+    """
+    Returns [(message, created, updates), ...] in input order, updates
+    being conversation_updates() for a created message's conversation ([]
+    for a duplicate). A batch holding a retried client_msg_id fails the bulk
+    insert; it's then replayed row by row so only the duplicates resolve to
+    their original messages.
+    """
+    try:
+        with transaction.atomic():
+            Message.objects.bulk_create(messages)
+            _record(messages)
+            updates = batch_conversation_updates({message.conversation_id for message in messages})
+        return [(message, True, updates[message.conversation_id]) for message in messages]
+    except IntegrityError:
+        if not any(message.client_msg_id for message in messages):
+            raise
+
+    results = []
+    with transaction.atomic():
+        for message in messages:
+            try:
+                with transaction.atomic():
+                    message.pk = None
+                    message.save()
+                results.append((message, True))
+            except IntegrityError:
+                if not message.client_msg_id:
+                    raise
+                results.append((Message.objects.get(
+                    sender_id=message.sender_id, client_msg_id=message.client_msg_id
+                ), False))
+        created = [message for message, created in results if created]
+        _record(created)
+        updates = batch_conversation_updates({message.conversation_id for message in created})
+    return [
+        (message, created, updates[message.conversation_id] if created else [])
+        for message, created in results
+    ]
+
+
+class MessageBatcher:
+    def __init__(self, max_size=100, max_delay=0.005):
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self._pending = []  # [(Message, Future), ...]
+        self._timer = None
+        # The loop only holds weak references to tasks — keep in-flight batches alive
+        self._tasks = set()
+
+    async def submit(self, conversation, sender, content, client_msg_id=None, attachment=None):
+        """Queue a message; returns (message, created, updates) once its batch commits"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        message = Message(
+            conversation=conversation, sender_id=sender.id,
+            content=content, client_msg_id=client_msg_id,
+        )
+        if attachment:
+            message.attachment_ref, message.attachment_type = attachment.ref, attachment.type
+        self._pending.append((message, future))
+
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._write(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._written)
+
+    def _written(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Message batch task failed", exc_info=task.exception())
+
+    async def _write(self, batch):
+        try:
+            results = await persist_batch([message for message, _ in batch])
+        except Exception as e:
+            logger.exception("Failed to persist a batch of %d messages", len(batch))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+def get_message_batcher():
+    """The configured batcher, or None when messages are written one by one"""
+    if not getattr(settings, "CHAT_BATCH_WRITES", False):
+        return None
+    return MessageBatcher(
+        max_size=settings.CHAT_BATCH_MAX_SIZE,
+        max_delay=settings.CHAT_BATCH_MAX_DELAY_MS / 1000,
+    )
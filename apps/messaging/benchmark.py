@@ -0,0 +1,134 @@
+# apps/messaging/benchmark.py
+"""
+Load-test driver for the Socket.IO chat tier (see `manage.py chat_benchmark`).
+
+run_benchmark() connects simulated users with the socketio client, drives
+send_message traffic and measures send → new_message delivery latency.
+The server under test is apps.messaging.benchmark_asgi:application.
+"""
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass, field
+
+import socketio
+
+PATTERNS = ("pairs", "fanin", "burst")
+
+
+@dataclass
+class BenchResult:
+    sent: int = 0
+    delivered: int = 0
+    elapsed: float = 0.0
+    latencies: list = field(default_factory=list)
+    queries: int = 0
+
+    @property
+    def throughput(self):
+        return self.delivered / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, pct):
+        if not self.latencies:
+            return 0.0
+        if len(self.latencies) == 1:
+            return self.latencies[0]
+        return statistics.quantiles(self.latencies, n=100, method="inclusive")[pct - 1]
+
+    def report(self):
+        return {
+            "sent": self.sent,
+            "delivered": self.delivered,
+            "elapsed_s": round(self.elapsed, 3),
+            "throughput_msg_s": round(self.throughput, 1),
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p95_ms": round(self.percentile(95) * 1000, 2),
+            "p99_ms": round(self.percentile(99) * 1000, 2),
+            "queries_per_message": round(self.queries / self.sent, 2) if self.sent else 0.0,
+        }
+
+
+def plan_routes(pattern, senders, receivers):
+    """[(sender, receiver), ...] — who talks to whom for a traffic pattern"""
+    if pattern == "fanin":
+        return [(sender, receivers[0]) for sender in senders]
+    return list(zip(senders, receivers))
+
+
+async def _connect(url, token):
+    client = socketio.AsyncClient(reconnection=False)
+    await client.connect(url, auth={"token": token}, transports=["websocket"])
+    return client
+
+
+async def run_benchmark(url, senders, receivers, tokens, pattern="pairs",
+                        messages=100, rate=0.0, timeout=30.0):
+    """
+    senders/receivers are user ids, tokens maps user id → access token.
+    rate is messages/second per sender (0 = as fast as possible); the
+    "burst" pattern always sends without pacing.
+    """
+    result = BenchResult()
+    routes = plan_routes(pattern, senders, receivers)
+    sent_at = {}
+    expected = len(routes) * messages
+    all_delivered = asyncio.Event()
+
+    clients = {}
+    for user_id in {uid for route in routes for uid in route}:
+        clients[user_id] = await _connect(url, tokens[user_id])
+
+    def on_new_message(payload):
+        started = sent_at.pop(payload.get("content"), None)
+        if started is None:
+            return
+        result.latencies.append(time.perf_counter() - started)
+        result.delivered += 1
+        if result.delivered >= expected:
+            all_delivered.set()
+
+    for user_id in {receiver for _, receiver in routes}:
+        clients[user_id].on("new_message", on_new_message)
+
+    probe = clients[routes[0][0]]
+    await probe.call("bench_stats", {"reset": True})
+
+    async def drive(sender, receiver):
+        interval = 1.0 / rate if rate and pattern != "burst" else 0.0
+        for seq in range(messages):
+            content = f"bench:{sender}:{receiver}:{seq}"
+            sent_at[content] = time.perf_counter()
+            await clients[sender].emit("send_message", {"to_user": receiver, "message": content})
+            result.sent += 1
+            if interval:
+                await asyncio.sleep(interval)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(drive(sender, receiver) for sender, receiver in routes))
+    try:
+        await asyncio.wait_for(all_delivered.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    result.elapsed = time.perf_counter() - started
+
+    result.queries = (await probe.call("bench_stats"))["queries"]
+    for client in clients.values():
+        await client.disconnect()
+    return result
+
+
+async def open_idle_connections(url, tokens, batch_size=200):
+    """Connect one client per token, batch_size at a time; returns the clients"""
+    clients = []
+    for start in range(0, len(tokens), batch_size):
+        clients += await asyncio.gather(*(
+            _connect(url, token) for token in tokens[start:start + batch_size]
+        ))
+    return clients
+
+
+async def close_connections(clients, batch_size=500):
+    for start in range(0, len(clients), batch_size):
+        await asyncio.gather(*(
+            client.disconnect() for client in clients[start:start + batch_size]
+        ), return_exceptions=True)
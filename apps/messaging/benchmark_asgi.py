@@ -0,0 +1,45 @@
+# apps/messaging/benchmark_asgi.py
+"""
+ASGI app served by `manage.py chat_benchmark`.
+
+config.asgi.application plus a DB query counter and a `bench_stats` event,
+so the benchmark can read queries per message from the running server.
+Never used outside the benchmark.
+"""
+import threading
+
+from django.db.backends.signals import connection_created
+
+from config.asgi import application as chat_application
+from apps.messaging.ratelimit import get_throttle_counters
+from apps.messaging.socket import sio
+
+_query_count_lock = threading.Lock()
+_queries = [0]
+
+
+def _count_queries(execute, sql, params, many, context):
+    with _query_count_lock:
+        _queries[0] += 1
+    return execute(sql, params, many, context)
+
+
+def _install_counter(sender, connection, **kwargs):
+    # Fires on every reconnect of the same (per-thread) connection object
+    if _count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_queries)
+
+
+connection_created.connect(_install_counter)
+
+
+@sio.on('bench_stats')
+async def bench_stats(sid, data=None):
+    with _query_count_lock:
+        queries = _queries[0]
+        if data and data.get('reset'):
+            _queries[0] = 0
+    return {"queries": queries, "throttled": get_throttle_counters()}
+
+
+application = chat_application
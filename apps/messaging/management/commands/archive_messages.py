@@ -0,0 +1,39 @@
+# apps/messaging/management/commands/archive_messages.py
+"""
+Move messages of idle conversations into the archive table.
+
+    python manage.py archive_messages --idle-days 90
+
+Safe to run repeatedly (e.g. nightly from cron); a conversation that comes
+back to life simply starts filling the hot table again, and its history
+page reads through to the archive.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.messaging.archive import archive_conversation, idle_conversations
+
+
+class Command(BaseCommand):
+    help = "Archive messages of conversations idle longer than --idle-days"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--idle-days", type=int, default=90)
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be archived")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["idle_days"])
+        conversation_ids = list(idle_conversations(cutoff).values_list("id", flat=True))
+        if options["dry_run"]:
+            self.stdout.write(f"{len(conversation_ids)} idle conversations would be archived")
+            return
+
+        total = 0
+        for conversation_id in conversation_ids:
+            total += archive_conversation(conversation_id, cutoff, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {total} messages from {len(conversation_ids)} conversations"
+        ))
@@ -0,0 +1,116 @@
+# apps/messaging/management/commands/chat_benchmark.py
+"""
+Load-test the Socket.IO chat tier.
+
+    python manage.py chat_benchmark --clients 50 --messages 200 --pattern pairs
+
+Starts apps.messaging.benchmark_asgi:application under daphne against the
+configured database (SQLite via DB_ENGINE/DB_NAME, or a local Postgres),
+connects simulated users and reports throughput, send → new_message
+latency percentiles and DB queries per message. Run `migrate` first.
+
+The spawned server inherits the environment, so e.g. CHAT_RATE_LIMIT=false
+measures raw capacity and CHAT_BATCH_WRITES=true the batched write path.
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.messaging.benchmark import PATTERNS, run_benchmark
+from apps.users.authentication import UserClaimsRefreshToken
+
+User = get_user_model()
+
+BENCH_DOMAIN = "bench.chat.local"
+
+
+def bench_users(user_type, count):
+    users = []
+    for i in range(count):
+        email = f"{user_type}-{i}@{BENCH_DOMAIN}"
+        user, _ = User.objects.get_or_create(
+            username=email,
+            defaults={"email": email, "user_type": user_type, "full_name": f"Bench {user_type} {i}"},
+        )
+        users.append(user)
+    return users
+
+
+def wait_for_port(host, port, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+class Command(BaseCommand):
+    help = "Benchmark Socket.IO message throughput and delivery latency"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=20, help="Sending users")
+        parser.add_argument("--messages", type=int, default=50, help="Messages per sender")
+        parser.add_argument("--pattern", choices=PATTERNS, default="pairs",
+                            help="pairs: client i → worker i; fanin: every client → one worker; "
+                                 "burst: pairs with no pacing")
+        parser.add_argument("--rate", type=float, default=0.0,
+                            help="Messages/second per sender (0 = unpaced)")
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--no-server", action="store_true",
+                            help="Use a server already running on --host/--port")
+        parser.add_argument("--timeout", type=float, default=60.0)
+        parser.add_argument("--cleanup", action="store_true", help="Delete benchmark users and exit")
+
+    def handle(self, *args, **options):
+        if options["cleanup"]:
+            deleted, _ = User.objects.filter(email__endswith=f"@{BENCH_DOMAIN}").delete()
+            self.stdout.write(f"Deleted {deleted} benchmark rows")
+            return
+
+        clients = bench_users("client", options["clients"])
+        workers = bench_users("worker", 1 if options["pattern"] == "fanin" else options["clients"])
+        tokens = {
+            user.id: str(UserClaimsRefreshToken.for_user(user).access_token)
+            for user in clients + workers
+        }
+
+        server = None
+        host, port = options["host"], options["port"]
+        if not options["no_server"]:
+            server = subprocess.Popen(
+                [sys.executable, "-m", "daphne", "-v", "0", "-b", host, "-p", str(port),
+                 "apps.messaging.benchmark_asgi:application"],
+                env=os.environ.copy(),
+            )
+        try:
+            if not wait_for_port(host, port):
+                raise CommandError(f"Chat server did not come up on {host}:{port}")
+            result = asyncio.run(run_benchmark(
+                f"http://{host}:{port}",
+                senders=[user.id for user in clients],
+                receivers=[user.id for user in workers],
+                tokens=tokens,
+                pattern=options["pattern"],
+                messages=options["messages"],
+                rate=options["rate"],
+                timeout=options["timeout"],
+            ))
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=10)
+
+        self.stdout.write(json.dumps(result.report(), indent=2))
+        if result.delivered < result.sent:
+            self.stderr.write(f"{result.sent - result.delivered} messages were not delivered before the timeout")
@@ -0,0 +1,110 @@
+# apps/messaging/management/commands/chat_memory_benchmark.py
+"""
+Measure the socket server's memory per idle connection.
+
+    python manage.py chat_memory_benchmark --connections 10000
+
+Starts apps.messaging.benchmark_asgi:application under daphne, connects one
+idle websocket client per benchmark user, and reads the server's RSS
+(/proc/<pid>/status, Linux) before and after. Reports bytes per connection
+and MB per 10k connections. Run `migrate` first; the client side needs
+--connections file descriptors (the soft limit is raised to the hard one).
+"""
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.messaging.benchmark import close_connections, open_idle_connections
+from apps.messaging.management.commands.chat_benchmark import BENCH_DOMAIN, wait_for_port
+from apps.users.authentication import UserClaimsRefreshToken
+
+User = get_user_model()
+
+
+def idle_users(count):
+    emails = [f"idle-{i}@{BENCH_DOMAIN}" for i in range(count)]
+    existing = set(User.objects.filter(email__in=emails).values_list("email", flat=True))
+    User.objects.bulk_create([
+        User(username=email, email=email, user_type="client", full_name=f"Idle {i}")
+        for i, email in enumerate(emails) if email not in existing
+    ], batch_size=1000)
+    return list(User.objects.filter(email__in=emails))
+
+
+def rss_bytes(pid):
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    raise CommandError(f"No VmRSS for pid {pid}")
+
+
+class Command(BaseCommand):
+    help = "Benchmark server RSS per idle Socket.IO connection"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=10000)
+        parser.add_argument("--batch-size", type=int, default=200, help="Concurrent connects")
+        parser.add_argument("--settle", type=float, default=3.0, help="Seconds to wait before reading RSS")
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8766)
+
+    def handle(self, *args, **options):
+        count = options["connections"]
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        if hard < count + 100:
+            raise CommandError(f"Open file limit {hard} is too low for {count} connections")
+
+        users = idle_users(count)
+        with transaction.atomic():
+            tokens = [str(UserClaimsRefreshToken.for_user(user).access_token) for user in users]
+
+        host, port = options["host"], options["port"]
+        url = f"http://{host}:{port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "daphne", "-v", "0", "-b", host, "-p", str(port),
+             "apps.messaging.benchmark_asgi:application"],
+            env=os.environ.copy(),
+        )
+        try:
+            if not wait_for_port(host, port):
+                raise CommandError(f"Chat server did not come up on {host}:{port}")
+            report = asyncio.run(self.measure(server.pid, url, tokens, options))
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+        self.stdout.write(json.dumps(report, indent=2))
+
+    async def measure(self, pid, url, tokens, options):
+        # Warm up imports, DB connection and caches so they don't count
+        await close_connections(await open_idle_connections(url, tokens[:10]))
+        await asyncio.sleep(options["settle"])
+        baseline = rss_bytes(pid)
+
+        started = time.perf_counter()
+        clients = await open_idle_connections(url, tokens, batch_size=options["batch_size"])
+        connect_time = time.perf_counter() - started
+        await asyncio.sleep(options["settle"])
+        loaded = rss_bytes(pid)
+        await close_connections(clients)
+
+        per_connection = (loaded - baseline) / len(clients)
+        return {
+            "connections": len(clients),
+            "connect_s": round(connect_time, 2),
+            "rss_baseline_mb": round(baseline / 2**20, 1),
+            "rss_connected_mb": round(loaded / 2**20, 1),
+            "bytes_per_connection": round(per_connection),
+            "mb_per_10k_connections": round(per_connection * 10000 / 2**20, 1),
+        }
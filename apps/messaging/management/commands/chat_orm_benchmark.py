@@ -0,0 +1,107 @@
+# apps/messaging/management/commands/chat_orm_benchmark.py
+"""
+Compare the socket send path's database side, in process (no network):
+
+    python manage.py chat_orm_benchmark --senders 20 --messages 50
+
+- hops: the previous chain — retry check, conversation lookup, insert +
+  summary and the inbox updates each wrapped in its own
+  database_sync_to_async call
+- merged: socket.deliver_message — the same work in a single hop
+
+Every sender runs concurrently on one event loop, as connections do on a
+socket server, so both paths share the single sync thread that
+thread-sensitive database calls run on. Reports events per second for each.
+Run `migrate` first; benchmark users are shared with chat_benchmark.
+"""
+import asyncio
+import json
+import time
+import uuid
+
+from channels.db import database_sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps.messaging.management.commands.chat_benchmark import BENCH_DOMAIN, bench_users
+from apps.messaging.models import Conversation, Message
+from apps.messaging.socket import create_conversation, deliver_message, save_message
+from apps.messaging.sync import conversation_updates
+from apps.messaging.user_cache import ChatUser
+
+User = get_user_model()
+
+
+def find_conversation(sender, receiver):
+    user_low_id, user_high_id = Conversation.direct_pair(sender.id, receiver.id)
+    return Conversation.objects.filter(
+        is_group=False, user_low_id=user_low_id, user_high_id=user_high_id,
+    ).first()
+
+
+async def send_with_hops(sender, receiver, content, client_msg_id):
+    existing = await database_sync_to_async(
+        Message.objects.filter(sender_id=sender.id, client_msg_id=client_msg_id).first
+    )()
+    if existing:
+        return
+    conversation = await database_sync_to_async(find_conversation)(sender, receiver)
+    if conversation is None:
+        conversation = await database_sync_to_async(create_conversation)(sender, receiver)
+    await database_sync_to_async(save_message)(conversation, sender, content, client_msg_id)
+    await database_sync_to_async(conversation_updates)(conversation.id)
+
+
+async def send_merged(sender, receiver, content, client_msg_id):
+    await deliver_message(sender, content, receiver=receiver, client_msg_id=client_msg_id)
+
+
+async def run(send, pairs, messages):
+    async def sender_loop(sender, receiver):
+        for i in range(messages):
+            await send(sender, receiver, f"bench {i}", uuid.uuid4().hex)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(sender_loop(sender, receiver) for sender, receiver in pairs))
+    elapsed = time.perf_counter() - started
+    events = len(pairs) * messages
+    return {
+        "events": events,
+        "seconds": round(elapsed, 3),
+        "events_per_sec": round(events / elapsed, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark send_message's DB path: per-step thread hops vs the merged single hop"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--senders", type=int, default=20)
+        parser.add_argument("--messages", type=int, default=50, help="Messages per sender")
+        parser.add_argument("--cleanup", action="store_true", help="Delete benchmark users and exit")
+
+    def handle(self, *args, **options):
+        if options["cleanup"]:
+            deleted, _ = User.objects.filter(email__endswith=f"@{BENCH_DOMAIN}").delete()
+            self.stdout.write(f"Deleted {deleted} benchmark rows")
+            return
+
+        clients = bench_users("client", options["senders"])
+        workers = bench_users("worker", options["senders"])
+        pairs = [
+            (ChatUser.from_user(client), ChatUser.from_user(worker))
+            for client, worker in zip(clients, workers)
+        ]
+
+        # Conversations exist up front so neither run pays for creating them
+        for sender, receiver in pairs:
+            if find_conversation(sender, receiver) is None:
+                create_conversation(sender, receiver)
+
+        report = {}
+        for name, send in (("hops", send_with_hops), ("merged", send_merged)):
+            report[name] = asyncio.run(run(send, pairs, options["messages"]))
+        report["speedup"] = round(
+            report["merged"]["events_per_sec"] / report["hops"]["events_per_sec"], 2
+        )
+        self.stdout.write(json.dumps(report, indent=2))
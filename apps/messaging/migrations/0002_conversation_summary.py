@@ -0,0 +1,63 @@
+# Generated by Django 6.0 on 2026-10-17 00:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_summaries(apps, schema_editor):
+    Conversation = apps.get_model('messaging', 'Conversation')
+    ConversationParticipant = apps.get_model('messaging', 'ConversationParticipant')
+    Message = apps.get_model('messaging', 'Message')
+
+    for conversation in Conversation.objects.iterator():
+        latest = (
+            Message.objects.filter(conversation=conversation)
+            .order_by('-created_at', '-id')
+            .first()
+        )
+        if latest:
+            conversation.last_message = latest.content
+            conversation.last_message_time = latest.created_at
+            conversation.last_message_sender_id = latest.sender_id
+            conversation.save(update_fields=['last_message', 'last_message_time', 'last_message_sender'])
+
+    for participant in ConversationParticipant.objects.iterator():
+        participant.unread_count = (
+            Message.objects.filter(conversation_id=participant.conversation_id, is_read=False)
+            .exclude(sender_id=participant.user_id)
+            .count()
+        )
+        participant.save(update_fields=['unread_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_sender',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_time',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversationparticipant',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 6.0 on 2026-10-17 00:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_direct_pairs(apps, schema_editor):
+    Conversation = apps.get_model('messaging', 'Conversation')
+    ConversationParticipant = apps.get_model('messaging', 'ConversationParticipant')
+
+    seen = set()
+    for conversation in Conversation.objects.filter(is_group=False).order_by('created_at', 'id').iterator():
+        user_ids = list(
+            ConversationParticipant.objects.filter(conversation=conversation)
+            .values_list('user_id', flat=True)
+        )
+        if len(user_ids) != 2:
+            continue
+        pair = tuple(sorted(user_ids))
+        if pair in seen:
+            # Duplicate created by the old find-or-create race: the oldest
+            # conversation keeps the key, later ones stay unkeyed.
+            continue
+        seen.add(pair)
+        conversation.user_low_id, conversation.user_high_id = pair
+        conversation.save(update_fields=['user_low', 'user_high'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0003_message_history_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='user_high',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='user_low',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_direct_pairs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_group', False)), fields=('user_low', 'user_high'), name='unique_direct_conversation'),
+        ),
+    ]
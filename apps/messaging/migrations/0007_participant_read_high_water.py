@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-17 01:01
+
+from django.db import migrations, models
+
+
+def backfill_high_water(apps, schema_editor):
+    ConversationParticipant = apps.get_model('messaging', 'ConversationParticipant')
+    Message = apps.get_model('messaging', 'Message')
+
+    for participant in ConversationParticipant.objects.filter(last_read_at__isnull=False).iterator():
+        participant.last_read_message_id = (
+            Message.objects.filter(
+                conversation_id=participant.conversation_id,
+                created_at__lte=participant.last_read_at,
+            ).order_by('-created_at', '-id').values_list('id', flat=True).first()
+        )
+        participant.save(update_fields=['last_read_message_id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0006_message_client_msg_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationparticipant',
+            name='last_read_message_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_high_water, migrations.RunPython.noop),
+    ]
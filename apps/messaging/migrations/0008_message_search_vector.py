@@ -0,0 +1,47 @@
+# Generated by Django 6.0 on 2026-10-17 01:03
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Postgres only — other backends keep the column NULL and search falls back
+# to LIKE (apps/messaging/search.py).
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX messaging_message_search_gin "
+        "ON messaging_message USING gin (search_vector)"
+    )
+    schema_editor.execute(
+        "CREATE TRIGGER messaging_message_search_update "
+        "BEFORE INSERT OR UPDATE OF content ON messaging_message "
+        "FOR EACH ROW EXECUTE FUNCTION "
+        "tsvector_update_trigger(search_vector, 'pg_catalog.english', content)"
+    )
+    schema_editor.execute(
+        "UPDATE messaging_message SET search_vector = to_tsvector('pg_catalog.english', content)"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP TRIGGER IF EXISTS messaging_message_search_update ON messaging_message")
+    schema_editor.execute("DROP INDEX IF EXISTS messaging_message_search_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0007_participant_read_high_water'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 6.0 on 2026-10-17 01:04
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+# On Postgres the archive is range-partitioned by month on created_at, so
+# the table is created by hand: a partitioned table's primary key has to
+# include the partition key. Monthly partitions are added on demand by
+# apps.messaging.archive; the DEFAULT partition catches anything else.
+# Other backends get a plain table.
+def create_archive_table(apps, schema_editor):
+    ArchivedMessage = apps.get_model('messaging', 'ArchivedMessage')
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        schema_editor.create_model(ArchivedMessage)
+        return
+
+    qn = schema_editor.quote_name
+    table = ArchivedMessage._meta.db_table
+    conversation = ArchivedMessage._meta.get_field('conversation')
+    sender = ArchivedMessage._meta.get_field('sender')
+    schema_editor.execute(f"""
+        CREATE TABLE {qn(table)} (
+            "id" bigint NOT NULL,
+            "conversation_id" {conversation.db_type(connection)} NOT NULL
+                REFERENCES {qn(conversation.related_model._meta.db_table)} ("id") DEFERRABLE INITIALLY DEFERRED,
+            "sender_id" {sender.db_type(connection)} NOT NULL
+                REFERENCES {qn(sender.related_model._meta.db_table)} ("id") DEFERRABLE INITIALLY DEFERRED,
+            "content" text NOT NULL,
+            "created_at" timestamp with time zone NOT NULL,
+            "client_msg_id" varchar(64) NULL,
+            "archived_at" timestamp with time zone NOT NULL,
+            PRIMARY KEY ("id", "created_at")
+        ) PARTITION BY RANGE ("created_at")
+    """)
+    schema_editor.execute(f"CREATE TABLE {qn(table + '_default')} PARTITION OF {qn(table)} DEFAULT")
+    schema_editor.execute(
+        f'CREATE INDEX "messaging_a_convers_e59e2e_idx" ON {qn(table)} ("conversation_id", "created_at", "id")'
+    )
+    schema_editor.execute(f'CREATE INDEX ON {qn(table)} ("sender_id")')
+
+
+def drop_archive_table(apps, schema_editor):
+    ArchivedMessage = apps.get_model('messaging', 'ArchivedMessage')
+    # Dropping a partitioned table drops its partitions too
+    schema_editor.delete_model(ArchivedMessage)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0008_message_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ArchivedMessage',
+                    fields=[
+                        ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                        ('content', models.TextField()),
+                        ('created_at', models.DateTimeField()),
+                        ('client_msg_id', models.CharField(blank=True, max_length=64, null=True)),
+                        ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_messages', to='messaging.conversation')),
+                        ('sender', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'ordering': ['created_at'],
+                        'indexes': [models.Index(fields=['conversation', 'created_at', 'id'], name='messaging_a_convers_e59e2e_idx')],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_archive_table, drop_archive_table),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-17 01:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0009_archived_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedmessage',
+            name='attachment_ref',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='archivedmessage',
+            name='attachment_type',
+            field=models.CharField(blank=True, choices=[('image', 'Image'), ('video', 'Video'), ('file', 'File')], default='', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='attachment_ref',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='attachment_type',
+            field=models.CharField(blank=True, choices=[('image', 'Image'), ('video', 'Video'), ('file', 'File')], default='', max_length=16),
+        ),
+    ]
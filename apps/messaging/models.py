@@ -1,28 +1,92 @@
 # apps/messaging/models.py
 
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
 User = get_user_model()
 
+ATTACHMENT_TYPE_CHOICES = [
+    ('image', 'Image'),
+    ('video', 'Video'),
+    ('file', 'File'),
+]
+
+# Inbox preview for a message that is only an attachment
+ATTACHMENT_PREVIEW = '📎 Attachment'
+
 class Conversation(models.Model):
     is_group = models.BooleanField(default=False)
     name = models.CharField(max_length=255, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Denormalized summary of the newest message so the inbox never has to
+    # scan the messages table.
+    last_message = models.TextField(blank=True, default='')
+    last_message_time = models.DateTimeField(null=True, blank=True)
+    last_message_sender = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+
+    # Canonical key for 1:1 chats (lower user id first) so finding the
+    # conversation between two users is a single unique-index probe.
+    user_low = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, blank=True, related_name='+'
+    )
+    user_high = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, blank=True, related_name='+'
+    )
+
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user_low', 'user_high'],
+                condition=models.Q(is_group=False),
+                name='unique_direct_conversation',
+            ),
+        ]
 
     def __str__(self):
         return self.name or f"Chat {self.id}"
 
+    @staticmethod
+    def direct_pair(user_a_id, user_b_id):
+        """(user_low_id, user_high_id) for a 1:1 chat between two users"""
+        return (user_a_id, user_b_id) if user_a_id < user_b_id else (user_b_id, user_a_id)
+
+    def record_messages(self, messages):
+        """Update the last-message summary and unread counters for new messages"""
+        if not messages:
+            return
+        latest = max(messages, key=lambda m: (m.created_at, m.id))
+        self.last_message = latest.content or (ATTACHMENT_PREVIEW if latest.attachment_ref else '')
+        self.last_message_time = latest.created_at
+        self.last_message_sender_id = latest.sender_id
+        self.save(update_fields=['last_message', 'last_message_time', 'last_message_sender'])
+
+        sent_by = {}
+        for message in messages:
+            sent_by[message.sender_id] = sent_by.get(message.sender_id, 0) + 1
+        for sender_id, count in sent_by.items():
+            self.participants.exclude(user_id=sender_id).update(
+                unread_count=models.F('unread_count') + count,
+                updated_at=timezone.now(),
+            )
+
 
 class ConversationParticipant(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='participants')
     last_read_at = models.DateTimeField(null=True, blank=True)
+    # Read high-water mark: every message with id <= this is read
+    last_read_message_id = models.BigIntegerField(null=True, blank=True)
+    unread_count = models.PositiveIntegerField(default=0)
     joined_at = models.DateTimeField(auto_now_add=True)
+    # Bumped on every read-state / unread change; drives delta sync.
+    # .update() skips auto_now, so callers set it explicitly there.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ('user', 'conversation')
@@ -37,10 +101,56 @@ class Message(models.Model):
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
-    is_read = models.BooleanField(default=False)
+    is_read = models.BooleanField(default=False)  # legacy — read state is ConversationParticipant.last_read_message_id
+    # Client-generated id so retried sends are recognised, not re-inserted
+    client_msg_id = models.CharField(max_length=64, null=True, blank=True)
+    # Postgres only: tsvector of content, filled by a DB trigger on insert /
+    # update and GIN-indexed (migration 0008). Stays NULL on other backends.
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+    # Uploaded straight to storage by the client (see attachments.py); the
+    # message only carries the reference
+    attachment_ref = models.CharField(max_length=255, blank=True, default='')
+    attachment_type = models.CharField(max_length=16, choices=ATTACHMENT_TYPE_CHOICES, blank=True, default='')
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            # Keyset pagination of a conversation's history
+            models.Index(fields=['conversation', 'created_at', 'id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['sender', 'client_msg_id'],
+                condition=models.Q(client_msg_id__isnull=False),
+                name='unique_client_message',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.sender}: {self.content[:30]}"
+
+class ArchivedMessage(models.Model):
+    """
+    Messages of cold conversations, moved out of the hot Message table by
+    `manage.py archive_messages`. Ids are the original Message ids, so
+    history cursors and read high-water marks keep working. On Postgres the
+    table is range-partitioned by month on created_at (migration 0009).
+    """
+    id = models.BigIntegerField(primary_key=True)
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='archived_messages')
+    sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    content = models.TextField()
+    created_at = models.DateTimeField()
+    client_msg_id = models.CharField(max_length=64, null=True, blank=True)
+    attachment_ref = models.CharField(max_length=255, blank=True, default='')
+    attachment_type = models.CharField(max_length=16, choices=ATTACHMENT_TYPE_CHOICES, blank=True, default='')
+    archived_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['conversation', 'created_at', 'id']),
+        ]
 
     def __str__(self):
-        return f"{self.sender}: {self.content[:30]}"
\ No newline at end of file
+        return f"{self.sender}: {self.content[:30]}"
@@ -0,0 +1,88 @@
+# apps/messaging/pagination.py
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def parse_limit(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Clamp a ?limit= query param to 1..maximum"""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return default
+    return max(1, min(limit, maximum))
+
+
+def _cursor_position(querysets, cursor):
+    try:
+        cursor = int(cursor)
+    except (TypeError, ValueError):
+        raise InvalidCursor(cursor)
+    for queryset in querysets:
+        created_at = queryset.filter(id=cursor).values_list('created_at', flat=True).first()
+        if created_at is not None:
+            return created_at, cursor
+    raise InvalidCursor(cursor)
+
+
+def _newer(queryset, position, limit):
+    if position:
+        created_at, msg_id = position
+        queryset = queryset.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=msg_id)
+        )
+    return list(queryset.order_by('created_at', 'id')[:limit])
+
+
+def _older(queryset, position, limit):
+    if position:
+        created_at, msg_id = position
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=msg_id)
+        )
+    return list(queryset.order_by('-created_at', '-id')[:limit])
+
+
+def paginate_messages(queryset, before=None, after=None, limit=DEFAULT_PAGE_SIZE, archive=None):
+    """
+    Keyset pagination over (created_at, id) — served by the
+    (conversation, created_at, id) index on Message.
+
+    - no cursor → newest `limit` messages
+    - before=<id> → `limit` messages older than that message
+    - after=<id> → `limit` messages newer than that message
+
+    `archive` is the matching ArchivedMessage queryset, if any. Archived
+    messages are always older than the hot ones (a conversation is only
+    archived once idle), so it's only queried when the page runs past the
+    hot rows.
+
+    Returns (messages oldest-first, has_more) where has_more means more rows
+    exist past the page in the direction that was requested.
+    """
+    sources = [queryset] if archive is None else [queryset, archive]
+
+    if after is not None:
+        position = _cursor_position(sources, after)
+        page = []
+        for source in reversed(sources):  # oldest storage first
+            page += _newer(source, position, limit + 1 - len(page))
+            if len(page) > limit:
+                break
+        return page[:limit], len(page) > limit
+
+    position = _cursor_position(sources, before) if before is not None else None
+    page = []
+    for source in sources:
+        page += _older(source, position, limit + 1 - len(page))
+        if len(page) > limit:
+            break
+    has_more = len(page) > limit
+    page = page[:limit]
+    page.reverse()
+    return page, has_more
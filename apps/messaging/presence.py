@@ -0,0 +1,80 @@
+# apps/messaging/presence.py
+"""
+Who is online, and on which sids.
+
+Socket handlers talk to a presence registry instead of module-level dicts so
+several ASGI processes can share one view of connected users:
+
+- InMemoryPresence — single process (dev / tests)
+- RedisPresence    — shared across nodes; accepts any redis.asyncio-compatible
+                     client, so a Redis stand-in (e.g. fakeredis) works locally
+"""
+from django.conf import settings
+
+
+class InMemoryPresence:
+    def __init__(self):
+        self._sids = {}  # user_id → {sid, ...}
+
+    async def add(self, user_id, sid):
+        self._sids.setdefault(str(user_id), set()).add(sid)
+
+    async def remove(self, user_id, sid):
+        """Forget a sid. Returns True when it was the user's last connection."""
+        sids = self._sids.get(str(user_id))
+        if not sids:
+            return True
+        sids.discard(sid)
+        if not sids:
+            del self._sids[str(user_id)]
+            return True
+        return False
+
+    async def sids(self, user_id):
+        return set(self._sids.get(str(user_id), ()))
+
+
+class RedisPresence:
+    KEY_PREFIX = "chat:presence:"
+
+    def __init__(self, client, ttl=24 * 60 * 60):
+        self.client = client
+        # Safety net: a crashed node can't clean up its sids, so every set
+        # expires unless the user reconnects and refreshes it.
+        self.ttl = ttl
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        import redis.asyncio as redis
+        return cls(redis.Redis.from_url(url, decode_responses=True), **kwargs)
+
+    def _key(self, user_id):
+        return f"{self.KEY_PREFIX}{user_id}"
+
+    async def add(self, user_id, sid):
+        key = self._key(user_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.sadd(key, sid)
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+
+    async def remove(self, user_id, sid):
+        key = self._key(user_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.srem(key, sid)
+            pipe.scard(key)
+            _, remaining = await pipe.execute()
+        return remaining == 0
+
+    async def sids(self, user_id):
+        return {
+            sid.decode() if isinstance(sid, bytes) else sid
+            for sid in await self.client.smembers(self._key(user_id))
+        }
+
+
+def get_presence():
+    backend = getattr(settings, "CHAT_PRESENCE_BACKEND", "memory")
+    if backend == "redis":
+        return RedisPresence.from_url(settings.CHAT_REDIS_URL)
+    return InMemoryPresence()
@@ -0,0 +1,145 @@
+# apps/messaging/ratelimit.py
+"""
+Token-bucket rate limiting for socket events.
+
+Each sender has a bucket per user (all devices together) and per sid. A
+bucket holds up to `burst` tokens and refills at `rate` tokens/second; an
+event costs one token from each, and only when both have one. Buckets live in process memory or, for several
+nodes, in Redis (one atomic Lua call per check).
+"""
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+
+# How often each kind of bucket said no — read with get_throttle_counters()
+throttle_counters = Counter()
+
+
+def get_throttle_counters():
+    return dict(throttle_counters)
+
+
+class InMemoryBucketStore:
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key → (tokens, updated_at)
+
+    async def take(self, buckets):
+        """
+        buckets: [(key, rate, burst), ...]. Spends one token from every
+        bucket only if each has one; otherwise spends none. Returns seconds
+        until each bucket has a token (all 0 when allowed).
+        """
+        now = time.monotonic()
+        refilled = []
+        for key, rate, burst in buckets:
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            refilled.append(min(burst, tokens + (now - updated_at) * rate))
+        retry_after = [
+            0.0 if tokens >= 1 else (1 - tokens) / rate
+            for tokens, (_, rate, _) in zip(refilled, buckets)
+        ]
+        spend = 0 if any(retry_after) else 1
+        for tokens, (key, _, _) in zip(refilled, buckets):
+            self._buckets[key] = (tokens - spend, now)
+            self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    async def forget(self, key):
+        self._buckets.pop(key, None)
+
+
+class RedisBucketStore:
+    # Every bucket is checked before any is spent, in one atomic call. Uses
+    # the Redis server clock so every node refills buckets the same way.
+    SCRIPT = """
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local tokens, retry, allowed = {}, {}, true
+    for i, key in ipairs(KEYS) do
+        local rate = tonumber(ARGV[2 * i - 1])
+        local burst = tonumber(ARGV[2 * i])
+        local state = redis.call('HMGET', key, 'tokens', 'ts')
+        local ts = tonumber(state[2]) or now
+        tokens[i] = math.min(burst, (tonumber(state[1]) or burst) + (now - ts) * rate)
+        retry[i] = 0
+        if tokens[i] < 1 then
+            retry[i] = (1 - tokens[i]) / rate
+            allowed = false
+        end
+    end
+    for i, key in ipairs(KEYS) do
+        if allowed then
+            tokens[i] = tokens[i] - 1
+        end
+        redis.call('HSET', key, 'tokens', tostring(tokens[i]), 'ts', tostring(now))
+        redis.call('EXPIRE', key, math.ceil(tonumber(ARGV[2 * i]) / tonumber(ARGV[2 * i - 1])) + 1)
+        retry[i] = tostring(retry[i])
+    end
+    return retry
+    """
+    KEY_PREFIX = "chat:ratelimit:"
+
+    def __init__(self, client):
+        self.client = client
+        self._script = client.register_script(self.SCRIPT)
+
+    @classmethod
+    def from_url(cls, url):
+        import redis.asyncio as redis
+        return cls(redis.Redis.from_url(url))
+
+    async def take(self, buckets):
+        retry_after = await self._script(
+            keys=[self.KEY_PREFIX + key for key, _, _ in buckets],
+            args=[value for _, rate, burst in buckets for value in (rate, burst)],
+        )
+        return [float(value) for value in retry_after]
+
+    async def forget(self, key):
+        await self.client.delete(self.KEY_PREFIX + key)
+
+
+class SocketRateLimiter:
+    def __init__(self, store, user_rate, user_burst, sid_rate, sid_burst):
+        self.store = store
+        self.user_rate, self.user_burst = user_rate, user_burst
+        self.sid_rate, self.sid_burst = sid_rate, sid_burst
+
+    async def check(self, user_id, sid):
+        """
+        0 if the event may proceed, else seconds the sender should wait. A
+        rejected event spends no token from either bucket.
+        """
+        sid_retry, user_retry = await self.store.take([
+            (f"sid:{sid}", self.sid_rate, self.sid_burst),
+            (f"user:{user_id}", self.user_rate, self.user_burst),
+        ])
+        if sid_retry:
+            throttle_counters["sid"] += 1
+        elif user_retry:
+            throttle_counters["user"] += 1
+        return max(sid_retry, user_retry)
+
+    async def disconnected(self, sid):
+        await self.store.forget(f"sid:{sid}")
+
+
+def get_rate_limiter():
+    """The configured limiter, or None when CHAT_RATE_LIMIT is off"""
+    if not getattr(settings, "CHAT_RATE_LIMIT", True):
+        return None
+    if getattr(settings, "CHAT_RATE_LIMIT_BACKEND", "memory") == "redis":
+        store = RedisBucketStore.from_url(settings.CHAT_REDIS_URL)
+    else:
+        store = InMemoryBucketStore()
+    return SocketRateLimiter(
+        store,
+        user_rate=settings.CHAT_RATE_USER_PER_SEC,
+        user_burst=settings.CHAT_RATE_USER_BURST,
+        sid_rate=settings.CHAT_RATE_SID_PER_SEC,
+        sid_burst=settings.CHAT_RATE_SID_BURST,
+    )
@@ -0,0 +1,128 @@
+# apps/messaging/receipts.py
+"""
+Read receipts as a high-water mark.
+
+A participant's read state is ConversationParticipant.last_read_message_id:
+every message up to that id is read. Marking read never touches Message
+rows, and socket `mark_read` events are coalesced per (user, conversation)
+for CHAT_READ_FLUSH_MS, keeping only the highest id, then written together.
+"""
+import asyncio
+import logging
+
+from channels.db import database_sync_to_async
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .models import ArchivedMessage, ConversationParticipant, Message
+
+logger = logging.getLogger(__name__)
+
+
+def newest_message_ids(conversation_ids):
+    """{conversation_id: newest message id}, falling back to the archive for idle conversations"""
+    newest = dict(
+        Message.objects.filter(conversation_id__in=conversation_ids)
+        .values('conversation_id').annotate(newest=Max('id')).values_list('conversation_id', 'newest')
+    )
+    archived_only = set(conversation_ids) - newest.keys()
+    if archived_only:
+        newest.update(
+            ArchivedMessage.objects.filter(conversation_id__in=archived_only)
+            .values('conversation_id').annotate(newest=Max('id')).values_list('conversation_id', 'newest')
+        )
+    return newest
+
+
+def apply_read_receipts(receipts):
+    """
+    receipts: {(user_id, conversation_id): message_id}. Moves each
+    participant's high-water mark forward (never back, never past the
+    conversation's newest message) and recomputes its unread counter. Four
+    queries however many receipts: load participants, newest message per
+    conversation, count what's still unread after each mark, one bulk
+    UPDATE. Returns the updated participants.
+    """
+    if not receipts:
+        return []
+
+    key_filter = Q()
+    for user_id, conversation_id in receipts:
+        key_filter |= Q(user_id=user_id, conversation_id=conversation_id)
+
+    now = timezone.now()
+    with transaction.atomic():
+        participants = list(ConversationParticipant.objects.select_for_update().filter(key_filter))
+        if not participants:
+            return []
+
+        # Client-supplied ids are clamped — a mark past the newest message
+        # would hide every later message as read
+        newest = newest_message_ids({p.conversation_id for p in participants})
+        marks = {}
+        for participant in participants:
+            key = (participant.user_id, participant.conversation_id)
+            mark = min(receipts[key], newest.get(participant.conversation_id, 0))
+            if (participant.last_read_message_id or 0) < mark:
+                marks[f"p{participant.id}"] = (participant, mark)
+        if not marks:
+            return []
+        participants = [participant for participant, _ in marks.values()]
+
+        unread = Message.objects.filter(
+            conversation_id__in={p.conversation_id for p in participants},
+            id__gt=min(mark for _, mark in marks.values()),
+        ).aggregate(**{
+            key: Count('id', filter=Q(conversation_id=participant.conversation_id, id__gt=mark)
+                       & ~Q(sender_id=participant.user_id))
+            for key, (participant, mark) in marks.items()
+        })
+
+        for key, (participant, mark) in marks.items():
+            participant.last_read_message_id = mark
+            participant.last_read_at = now
+            participant.unread_count = unread[key]
+            participant.updated_at = now
+        ConversationParticipant.objects.bulk_update(
+            participants, ['last_read_message_id', 'last_read_at', 'unread_count', 'updated_at']
+        )
+    return participants
+
+
+class ReadReceiptBuffer:
+    def __init__(self, flush_delay=0.5, on_flushed=None):
+        self.flush_delay = flush_delay
+        # async callback(participants) — e.g. emit receipts to the rooms
+        self.on_flushed = on_flushed
+        self._pending = {}  # (user_id, conversation_id) → highest message id
+        self._timer = None
+        # The loop only holds weak references to tasks — keep in-flight writes alive
+        self._tasks = set()
+
+    def add(self, user_id, conversation_id, message_id):
+        key = (user_id, conversation_id)
+        if message_id > self._pending.get(key, 0):
+            self._pending[key] = message_id
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.flush_delay, self._flush)
+
+    def _flush(self):
+        self._timer = None
+        pending, self._pending = self._pending, {}
+        if pending:
+            task = asyncio.ensure_future(self._write(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _write(self, pending):
+        try:
+            participants = await database_sync_to_async(apply_read_receipts)(pending)
+        except Exception:
+            logger.exception("Failed to write %d read receipts", len(pending))
+            return
+        if participants and self.on_flushed:
+            try:
+                await self.on_flushed(participants)
+            except Exception:
+                logger.exception("Failed to broadcast %d read receipts", len(participants))
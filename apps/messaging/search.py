@@ -0,0 +1,55 @@
+# apps/messaging/search.py
+"""
+Full-text search over the messages of the caller's conversations.
+
+On Postgres, Message.search_vector is a tsvector maintained by a trigger
+(see migration 0008) and backed by a GIN index; results are ranked with
+ts_rank. Elsewhere (SQLite in dev) it falls back to a LIKE scan where
+every row ranks equally, so newest-first.
+
+Pagination is keyset on (rank, id), cursor "rank:id" (apps/users/search_cursor.py).
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Cast
+
+from apps.users.search_cursor import decode_cursor, encode_cursor
+
+from .models import Message
+
+SEARCH_CONFIG = 'english'
+DEFAULT_RESULTS = 20
+MAX_RESULTS = 50
+
+
+def search_messages(user, query, cursor=None, limit=DEFAULT_RESULTS, conversation_id=None):
+    """
+    Returns (messages, next_cursor). Each message carries a `rank`
+    annotation; next_cursor is None on the last page.
+    """
+    messages = Message.objects.filter(conversation__participants__user=user)
+    if conversation_id is not None:
+        messages = messages.filter(conversation_id=conversation_id)
+
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+        # ts_rank is float4; as float8 the value round-trips through the
+        # cursor exactly, so rank equality on the next page still matches
+        messages = messages.filter(search_vector=search_query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), search_query), FloatField())
+        )
+    else:
+        messages = messages.filter(content__icontains=query).annotate(
+            rank=Value(0.0, output_field=FloatField())
+        )
+
+    if cursor:
+        rank, message_id = decode_cursor(cursor)
+        messages = messages.filter(Q(rank__lt=rank) | Q(rank=rank, id__lt=message_id))
+
+    page = list(messages.select_related('sender').order_by('-rank', '-id')[:limit + 1])
+    if len(page) <= limit:
+        return page, None
+    page = page[:limit]
+    return page, encode_cursor(page[-1].rank, page[-1].id)
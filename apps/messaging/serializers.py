@@ -2,7 +2,8 @@
 
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Conversation, Message
+from .attachments import attachment_payload
+from .models import Conversation, ConversationParticipant, Message
 
 User = get_user_model()
 
@@ -34,8 +35,13 @@ class ConversationSerializer(serializers.ModelSerializer):
 
     def get_other_user(self, obj):
         if not hasattr(obj, '_cached_other_user'):
-            user = self.context['request'].user
-            other_participant = obj.participants.exclude(user=user).select_related('user').first()
+            others = getattr(obj, 'other_participants', None)
+            if others is not None:
+                # InboxView prefetches the other participants in one query
+                other_participant = others[0] if others else None
+            else:
+                user = self.context['request'].user
+                other_participant = obj.participants.exclude(user=user).select_related('user').first()
             obj._cached_other_user = other_participant.user if other_participant else None
         return obj._cached_other_user
 
@@ -61,26 +67,26 @@ class ConversationSerializer(serializers.ModelSerializer):
         return None
 
     def get_last_message(self, obj):
-        msg = obj.messages.order_by('-created_at').first()
-        return msg.content if msg else ""
+        return obj.last_message or ""
 
     def get_last_message_sender(self, obj):
-        msg = obj.messages.order_by('-created_at').first()
-        if not msg:
+        if not obj.last_message_time:
             return ""
-        user = self.context['request'].user
-        if msg.sender == user:
+        sender = obj.last_message_sender
+        if sender is None:
+            return ""
+        if sender.id == self.context['request'].user.id:
             return "Me"
-        full_name = msg.sender.full_name.strip()
-        return full_name or msg.sender.email
+        full_name = sender.full_name.strip()
+        return full_name or sender.email
 
     def get_last_message_is_me(self, obj):
-        msg = obj.messages.order_by('-created_at').first()
-        return msg.sender == self.context['request'].user if msg else False
+        if not obj.last_message_time:
+            return False
+        return obj.last_message_sender_id == self.context['request'].user.id
 
     def get_last_message_time(self, obj):
-        msg = obj.messages.order_by('-created_at').first()
-        return msg.created_at.isoformat() if msg else None
+        return obj.last_message_time.isoformat() if obj.last_message_time else None
 
 
 class ConversationDetailSerializer(serializers.ModelSerializer):
@@ -90,6 +96,7 @@ class ConversationDetailSerializer(serializers.ModelSerializer):
     my_profile_pic = serializers.SerializerMethodField()
     is_send_by_me = serializers.SerializerMethodField()
     is_read = serializers.SerializerMethodField()
+    attachment = serializers.SerializerMethodField()
 
     class Meta:
         model = Message
@@ -99,6 +106,7 @@ class ConversationDetailSerializer(serializers.ModelSerializer):
             'sender_email',
             'sender_profile_pic',
             'content',
+            'attachment',
             'created_at',
             'is_read',
             'is_send_by_me',
@@ -113,6 +121,9 @@ class ConversationDetailSerializer(serializers.ModelSerializer):
     def get_sender_email(self, obj):
         return obj.sender.email
 
+    def get_attachment(self, obj):
+        return attachment_payload(obj)
+
     def get_sender_profile_pic(self, obj):
         if obj.sender.profile_pic:
             return obj.sender.profile_pic.url
@@ -126,15 +137,49 @@ class ConversationDetailSerializer(serializers.ModelSerializer):
 
     def get_is_send_by_me(self, obj):
         request = self.context.get("request")
-        return obj.sender == request.user if request else False
+        return obj.sender_id == request.user.id if request else False
+
+    def get_viewer_last_read_message_id(self, obj):
+        # Loaded once and shared by every message in the page (the list
+        # serializer's children all read the same context dict).
+        if 'last_read_message_id' not in self.context:
+            participant = ConversationParticipant.objects.filter(
+                conversation_id=obj.conversation_id,
+                user=self.context['request'].user
+            ).first()
+            self.context['last_read_message_id'] = participant.last_read_message_id if participant else None
+        return self.context['last_read_message_id']
 
     def get_is_read(self, obj):
         request = self.context.get("request")
         if not request or not request.user.is_authenticated:
             return False
-        if obj.sender == request.user:
+        if obj.sender_id == request.user.id:
             return True
-        participant = obj.conversation.participants.filter(user=request.user).first()
-        if not participant or not participant.last_read_at:
+        last_read_message_id = self.get_viewer_last_read_message_id(obj)
+        if not last_read_message_id:
             return False
-        return obj.created_at <= participant.last_read_at
\ No newline at end of file
+        return obj.id <= last_read_message_id
+
+
+class MessageSearchSerializer(serializers.ModelSerializer):
+    sender_name = serializers.SerializerMethodField()
+    is_send_by_me = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Message
+        fields = (
+            'id',
+            'conversation_id',
+            'sender_name',
+            'content',
+            'created_at',
+            'is_send_by_me',
+        )
+
+    def get_sender_name(self, obj):
+        full_name = obj.sender.full_name.strip()
+        return full_name or obj.sender.email or obj.sender.username
+
+    def get_is_send_by_me(self, obj):
+        return obj.sender_id == self.context['request'].user.id
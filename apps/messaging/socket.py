@@ -1,70 +1,238 @@
 # apps/messaging/socket.py
 
 import socketio
+from asgiref.sync import async_to_sync
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.tokens import UntypedToken
+from django.db import IntegrityError, transaction
 from channels.db import database_sync_to_async
 from apps.messaging.models import Conversation, ConversationParticipant, Message
+from apps.messaging.attachments import InvalidAttachment, attachment_payload, parse_attachment
+from apps.messaging.batching import get_message_batcher
+from apps.messaging.presence import get_presence
+from apps.messaging.ratelimit import get_rate_limiter
+from apps.messaging.receipts import ReadReceiptBuffer
+from apps.messaging.sync import InvalidSyncCursor, aconversation_updates, build_sync_payload, conversation_updates
+from apps.messaging.user_cache import ChatUser, user_cache
+from apps.users.authentication import authenticate_token
 import logging
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
-# Global tracking
-connected_users = {}  # sid → user_id
-user_sockets = {}     # user_id → sid
+# Online users → sids, shared across nodes when Redis is configured
+presence = get_presence()
 
-sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins="*")
+# With Redis, emits to a room reach sockets connected to any node
+client_manager = (
+    socketio.AsyncRedisManager(settings.CHAT_REDIS_URL)
+    if settings.CHAT_REDIS_URL else None
+)
 
+# Per-user / per-sid token buckets (CHAT_RATE_LIMIT)
+rate_limiter = get_rate_limiter()
 
-# --- Database helpers ---
-@database_sync_to_async
-def get_user_by_id(user_id):
-    return User.objects.get(id=user_id)
+# Emitting from sync code (REST views): through Redis when configured,
+# otherwise via this process's server
+external_emitter = (
+    socketio.RedisManager(settings.CHAT_REDIS_URL, write_only=True)
+    if settings.CHAT_REDIS_URL else None
+)
 
+# Optional write-behind message persistence (CHAT_BATCH_WRITES)
+message_batcher = get_message_batcher()
 
-@database_sync_to_async
-def get_conversation(sender, receiver):
+CLIENT_MSG_ID_MAX_LENGTH = Message._meta.get_field('client_msg_id').max_length
+
+sio = socketio.AsyncServer(
+    async_mode='asgi',
+    cors_allowed_origins="*",
+    client_manager=client_manager,
+)
+
+
+# --- Database helpers ---
+# Plain reads use the async ORM. Writes need transaction.atomic(), which is
+# sync-only, so the whole write side of a send (find-or-create, insert,
+# summary, per-participant updates) runs as one sync call — one hop.
+async def get_conversation(sender, receiver):
     """
     Return existing conversation between two users if it exists.
     """
-    return Conversation.objects.filter(
+    user_low_id, user_high_id = Conversation.direct_pair(sender.id, receiver.id)
+    return await Conversation.objects.filter(
         is_group=False,
-        participants__user=sender
-    ).filter(
-        participants__user=receiver
-    ).first()
+        user_low_id=user_low_id,
+        user_high_id=user_high_id,
+    ).afirst()
 
 
-@database_sync_to_async
 def create_conversation(sender, receiver):
     """
     Safely create a conversation and participants.
+    The unique (user_low, user_high) key makes concurrent first messages
+    converge on a single conversation.
     """
-    conversation = Conversation.objects.create(is_group=False)
-    participants = [
-        ConversationParticipant(user=sender, conversation=conversation),
-        ConversationParticipant(user=receiver, conversation=conversation),
-    ]
-    ConversationParticipant.objects.bulk_create(participants, ignore_conflicts=True)
+    user_low_id, user_high_id = Conversation.direct_pair(sender.id, receiver.id)
+    try:
+        with transaction.atomic():
+            conversation = Conversation.objects.create(
+                is_group=False,
+                user_low_id=user_low_id,
+                user_high_id=user_high_id,
+            )
+            participants = [
+                ConversationParticipant(user_id=sender.id, conversation=conversation),
+                ConversationParticipant(user_id=receiver.id, conversation=conversation),
+            ]
+            ConversationParticipant.objects.bulk_create(participants, ignore_conflicts=True)
+    except IntegrityError:
+        # Lost the race — the other request created it first
+        conversation = Conversation.objects.get(
+            is_group=False,
+            user_low_id=user_low_id,
+            user_high_id=user_high_id,
+        )
     return conversation
 
 
-@database_sync_to_async
-def save_message(conversation, sender, content):
-    return Message.objects.create(
-        conversation=conversation,
-        sender=sender,
-        content=content
-    )
+def may_start_conversation(sender, receiver):
+    # Only clients can start conversations
+    return not (sender.user_type == 'worker' and receiver.user_type == 'client')
+
+
+def save_message(conversation, sender, content, client_msg_id=None, attachment=None):
+    """
+    Insert the message and update the conversation summary in one
+    transaction. Returns (message, created); created is False when
+    client_msg_id was already used by this sender (a retried send).
+    """
+    try:
+        with transaction.atomic():
+            message = Message.objects.create(
+                conversation=conversation,
+                sender_id=sender.id,
+                content=content,
+                client_msg_id=client_msg_id,
+                attachment_ref=attachment.ref if attachment else '',
+                attachment_type=attachment.type if attachment else '',
+            )
+            # NEW 🔥 — update last_message + last_message_time + unread counters
+            conversation.record_messages([message])
+    except IntegrityError:
+        if not client_msg_id:
+            raise
+        return Message.objects.get(sender_id=sender.id, client_msg_id=client_msg_id), False
+    return message, True
 
 
-# NEW 🔥 — update conversation last message + time
 @database_sync_to_async
-def update_conversation_last_message(conversation, message):
-    conversation.last_message = message.content
-    conversation.last_message_time = message.created_at
-    conversation.save(update_fields=["last_message", "last_message_time"])
+def deliver_message(sender, content, conversation=None, receiver=None, client_msg_id=None, attachment=None):
+    """
+    Everything send_message writes, in one thread hop: retry check, direct
+    conversation find-or-create (when `receiver` is given instead of
+    `conversation`), insert + summary, and the participants' inbox updates.
+
+    Returns (message, created, updates). message is None when a worker
+    tries to open a conversation with a client.
+    """
+    if client_msg_id:
+        existing = Message.objects.filter(sender_id=sender.id, client_msg_id=client_msg_id).first()
+        if existing:
+            return existing, False, []
+
+    if conversation is None:
+        user_low_id, user_high_id = Conversation.direct_pair(sender.id, receiver.id)
+        conversation = Conversation.objects.filter(
+            is_group=False, user_low_id=user_low_id, user_high_id=user_high_id,
+        ).first()
+        if conversation is None:
+            if not may_start_conversation(sender, receiver):
+                return None, False, []
+            conversation = create_conversation(sender, receiver)
+
+    message, created = save_message(conversation, sender, content, client_msg_id, attachment)
+    return message, created, conversation_updates(conversation.id) if created else []
+
+
+async def get_conversation_ids(user_id):
+    return [
+        conversation_id
+        async for conversation_id in ConversationParticipant.objects.filter(user_id=user_id)
+        .values_list('conversation_id', flat=True)
+    ]
+
+
+async def is_participant(user_id, conversation_id):
+    return await ConversationParticipant.objects.filter(
+        user_id=user_id, conversation_id=conversation_id
+    ).aexists()
+
+
+async def push_conversation_updates(conversation_id, updates=None):
+    """conversation_updated → each participant's user room, with their unread count"""
+    if updates is None:
+        updates = await aconversation_updates(conversation_id)
+    for user_id, summary in updates:
+        await sio.emit('conversation_updated', summary, room=str(user_id))
+
+
+def push_conversation_update_from_sync(conversation_id, user_id):
+    """Same event from sync code (e.g. a REST read) for a single participant"""
+    for uid, summary in conversation_updates(conversation_id, user_id=user_id):
+        if external_emitter:
+            external_emitter.emit('conversation_updated', summary, room=str(uid))
+        else:
+            async_to_sync(sio.emit)('conversation_updated', summary, room=str(uid))
+
+
+def message_payload(message, sender):
+    payload = {
+        "id": message.id,
+        "conversation_id": message.conversation_id,
+        "sender_id": str(sender.id),
+        "sender_name": sender.display_name,
+        "content": message.content,
+        "created_at": message.created_at.isoformat(),
+        "is_me": True
+    }
+    if message.client_msg_id:
+        payload["client_msg_id"] = message.client_msg_id
+    if message.attachment_ref:
+        payload["attachment"] = attachment_payload(message)
+    return payload
+
+
+def conversation_room(conversation_id):
+    return f"conversation:{conversation_id}"
+
+
+async def join_conversation(sid, user_id, conversation_id):
+    """
+    True if the user may post to the conversation. Rooms joined on connect
+    answer from memory; conversations joined later cost one check, then the
+    sid joins that room too.
+    """
+    room = conversation_room(conversation_id)
+    if room in sio.rooms(sid):
+        return True
+    if await is_participant(user_id, conversation_id):
+        await sio.enter_room(sid, room)
+        return True
+    return False
+
+
+async def enter_conversation_room(conversation_id, user_ids):
+    """
+    Put the participants' live sockets on this node into the conversation
+    room — for a conversation created (or joined) after they connected.
+    """
+    room = conversation_room(conversation_id)
+    for user_id in user_ids:
+        for sid in await presence.sids(user_id):
+            # Presence spans nodes; only sockets held here can enter a room here
+            if sio.manager.is_connected(sid, '/') and room not in sio.rooms(sid):
+                await sio.enter_room(sid, room)
 
 
 # --- Socket.IO events ---
@@ -76,79 +244,216 @@ async def connect(sid, environ, auth):
 
     try:
         token = token.replace("Bearer ", "")
-        payload = UntypedToken(token)
-        user_id = int(payload['user_id'])
-        user = await get_user_by_id(user_id)
+        # Built from the token claims (JWT_STATELESS_AUTH) — no users_user
+        # lookup on connect
+        authenticated = await database_sync_to_async(authenticate_token)(token)
     except Exception as e:
         print("Connection failed:", e)
         return False
 
-    connected_users[sid] = str(user.id)
-    user_sockets[str(user.id)] = sid
+    # The session keeps only the compact ChatUser record (shared with the
+    # user cache), not a User instance. A cold cache is seeded from the
+    # authenticated user, not the DB — its claims are current: tokens issued
+    # before a profile edit authenticate from the row (mark_claims_changed).
+    user = user_cache.peek(authenticated.id)
+    if user is None:
+        user = ChatUser.from_claims(authenticated)
+        user_cache.put(user)
     await sio.save_session(sid, {'user': user})
+    # Every device of a user joins the same room
     await sio.enter_room(sid, str(user.id))
+    # ...and one room per conversation (single query), so a group message is
+    # one room emit instead of a per-recipient loop
+    for conversation_id in await get_conversation_ids(user.id):
+        await sio.enter_room(sid, conversation_room(conversation_id))
+    await presence.add(user.id, sid)
 
-    print(f"Connected: {user.get_full_name()} ({user.id})")
+    print(f"Connected: {user.display_name} ({user.id})")
     return True
 
 
 @sio.event
 async def send_message(sid, data):
-    user_id = connected_users.get(sid)
-    if not user_id:
+    # Identity comes from the session (set on connect), not the cache or DB
+    session = await sio.get_session(sid)
+    sender = session.get('user')
+    if not sender:
         return
+    user_id = sender.id
+
+    # Over the limit → tell the client and do no DB work
+    if rate_limiter:
+        retry_after = await rate_limiter.check(user_id, sid)
+        if retry_after:
+            await sio.emit('rate_limited', {
+                'event': 'send_message',
+                'retry_after': round(retry_after, 3),
+            }, to=sid)
+            return
 
+    conversation_id = data.get('conversation_id')
     receiver_id = data.get('to_user')
-    content = data.get('message', '').strip()
+    content = (data.get('message') or '').strip()
+
+    # Only a reference to a file the client already uploaded straight to storage
+    attachment = None
+    if data.get('attachment'):
+        try:
+            attachment = parse_attachment(data['attachment'], user_id)
+        except InvalidAttachment:
+            await sio.emit('error', {'error': 'Invalid attachment'}, to=sid)
+            return
 
-    if not receiver_id or not content:
+    if not (receiver_id or conversation_id) or not (content or attachment):
         await sio.emit('error', {'error': 'Invalid data'}, to=sid)
         return
 
-    try:
-        sender = await get_user_by_id(user_id)
-        receiver = await get_user_by_id(int(receiver_id))
-    except Exception:
-        await sio.emit('error', {'error': 'User not found'}, to=sid)
-        return
+    client_msg_id = data.get('client_msg_id')
+    if client_msg_id is not None:
+        client_msg_id = str(client_msg_id) or None
+        # Truncating could make two different ids collide and drop a message as a "retry"
+        if client_msg_id and len(client_msg_id) > CLIENT_MSG_ID_MAX_LENGTH:
+            await sio.emit('error', {'error': 'client_msg_id too long'}, to=sid)
+            return
+
+    conversation = receiver = None
+    if conversation_id:
+        # Group (or any existing) conversation → fan out through its room
+        try:
+            conversation_id = int(conversation_id)
+        except (TypeError, ValueError):
+            conversation_id = None
+        if not conversation_id or not await join_conversation(sid, user_id, conversation_id):
+            await sio.emit('error', {'error': 'Conversation not found'}, to=sid)
+            return
+        # Only the pk is needed to save the message and update the summary
+        conversation = Conversation(id=conversation_id)
+    else:
+        try:
+            receiver = await user_cache.get(int(receiver_id))
+        except (TypeError, ValueError):
+            receiver = None
+        if not receiver:
+            await sio.emit('error', {'error': 'User not found'}, to=sid)
+            return
 
-    # Find or create conversation
-    conversation = await get_conversation(sender, receiver)
-    if not conversation:
-        # Only clients can start conversations
-        if sender.user_type == 'worker' and receiver.user_type == 'client':
+    if message_batcher:
+        # A retried client_msg_id resolves to the original inside the batch
+        # write (created=False) — no per-message lookup up front
+        if conversation is None:
+            conversation = await get_conversation(sender, receiver)
+            if conversation is None:
+                if not may_start_conversation(sender, receiver):
+                    await sio.emit('error', {'error': 'Worker cannot send first message'}, to=sid)
+                    return
+                conversation = await database_sync_to_async(create_conversation)(sender, receiver)
+        # Saved, summary and inbox updates read with the rest of its batch;
+        # resumes after commit
+        message, created, updates = await message_batcher.submit(
+            conversation, sender, content, client_msg_id, attachment,
+        )
+    else:
+        # Find-or-create, insert, summary and inbox updates: a single hop
+        message, created, updates = await deliver_message(
+            sender, content, conversation=conversation, receiver=receiver,
+            client_msg_id=client_msg_id, attachment=attachment,
+        )
+        if message is None:
             await sio.emit('error', {'error': 'Worker cannot send first message'}, to=sid)
             return
-        conversation = await create_conversation(sender, receiver)
 
-    # Save message
-    message = await save_message(conversation, sender, content)
+    payload = message_payload(message, sender)
+    if not created:
+        # Lost a race with a concurrent retry of the same send
+        await sio.emit('message_sent', payload, to=sid)
+        return
 
-    # NEW 🔥 — update last_message + last_message_time so it goes to top in inbox
-    await update_conversation_last_message(conversation, message)
+    # One row per participant — also the recipient list
+    participant_ids = [user_id for user_id, _ in updates]
 
-    payload = {
-        "id": message.id,
-        "conversation_id": conversation.id,
-        "sender_id": str(sender.id),
-        "sender_name": sender.get_full_name() or sender.username,
-        "content": message.content,
-        "created_at": message.created_at.isoformat(),
-        "is_me": True
-    }
+    if receiver is not None:
+        # The conversation may have been created just now, after the
+        # participants' sockets joined their rooms on connect
+        await enter_conversation_room(message.conversation_id, participant_ids)
 
-    # Send to receiver if online
-    receiver_sid = user_sockets.get(str(receiver.id))
-    if receiver_sid:
-        await sio.emit('new_message', payload, room=receiver_sid)
+    # One emit reaches every recipient and the sender's other devices. Room
+    # entry is per node, so the participants' user rooms are included too;
+    # a socket in several of these rooms still gets the message once.
+    rooms = [conversation_room(message.conversation_id), *(str(user_id) for user_id in participant_ids)]
+    await sio.emit('new_message', payload, room=rooms, skip_sid=sid)
 
     # Send confirmation to sender
     await sio.emit('message_sent', payload, to=sid)
 
+    # Inbox order + unread badges, pushed instead of polled
+    await push_conversation_updates(message.conversation_id, updates)
+
+
+async def broadcast_read_receipts(participants):
+    for participant in participants:
+        # Other members see how far this user has read...
+        await sio.emit('read_receipt', {
+            "conversation_id": participant.conversation_id,
+            "user_id": str(participant.user_id),
+            "last_read_message_id": participant.last_read_message_id,
+        }, room=conversation_room(participant.conversation_id))
+        # ...and the reader's own devices get the new unread count
+        updates = await aconversation_updates(participant.conversation_id, user_id=participant.user_id)
+        for user_id, summary in updates:
+            await sio.emit('conversation_updated', summary, room=str(user_id))
+
+
+read_receipts = ReadReceiptBuffer(
+    flush_delay=settings.CHAT_READ_FLUSH_MS / 1000,
+    on_flushed=broadcast_read_receipts,
+)
+
+
+@sio.event
+async def mark_read(sid, data):
+    """{conversation_id, message_id}: everything up to message_id has been read"""
+    session = await sio.get_session(sid)
+    user = session.get('user')
+    data = data or {}
+    try:
+        conversation_id = int(data.get('conversation_id'))
+        message_id = int(data.get('message_id'))
+    except (TypeError, ValueError):
+        return {"success": False, "error": "Invalid data"}
+    if not user or not await join_conversation(sid, user.id, conversation_id):
+        return {"success": False, "error": "Conversation not found"}
+
+    # Coalesced with other receipts and written in one batch
+    read_receipts.add(user.id, conversation_id, message_id)
+    return {"success": True}
+
+
+@sio.event
+async def sync(sid, data):
+    """Delta since the client's cursor — returned as the event ack"""
+    session = await sio.get_session(sid)
+    user = session.get('user')
+    if not user:
+        return {"success": False, "error": "Not authenticated"}
+
+    data = data or {}
+    if not isinstance(data, dict):
+        return {"success": False, "error": "Invalid data"}
+    try:
+        payload = await database_sync_to_async(build_sync_payload)(
+            user, data.get('cursor'), data.get('limit')
+        )
+    except InvalidSyncCursor:
+        return {"success": False, "error": "Invalid cursor"}
+    return {"success": True, **payload}
+
 
 @sio.event
 async def disconnect(sid):
-    user_id = connected_users.pop(sid, None)
-    if user_id and user_sockets.get(user_id) == sid:
-        user_sockets.pop(user_id)
+    session = await sio.get_session(sid)
+    user_id = session['user'].id if session.get('user') else None
+    if user_id:
+        await presence.remove(user_id, sid)
+    if rate_limiter:
+        await rate_limiter.disconnected(sid)
     print(f"Disconnected: {user_id}")
@@ -0,0 +1,212 @@
+# apps/messaging/sync.py
+"""
+Delta sync for reconnecting clients.
+
+Two streams are paged with (time, id) keysets: messages on
+(created_at, id) and participant rows — read states, unread counters — on
+(updated_at, id). The cursor holds the position in both:
+"<message µs>:<message id>:<participant µs>:<participant id>".
+
+Ids and timestamps are assigned before commit, so a row can become
+visible after a sync has already read past its position. Within one round
+(has_more) the cursor advances strictly; the cursor that ends a round is
+pulled back to CHAT_SYNC_GRACE_SECONDS before "now", so the next sync
+re-reads that window and picks up late commits. Rows can therefore repeat
+across syncs — clients dedupe messages by id and keep the newest read
+state per (conversation, user).
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .attachments import attachment_payload
+from .models import Conversation, ConversationParticipant, Message
+from .pagination import parse_limit
+
+DEFAULT_SYNC_LIMIT = 200
+MAX_SYNC_LIMIT = 500
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class InvalidSyncCursor(Exception):
+    pass
+
+
+def _to_micros(dt):
+    # Exact — the keyset compares these timestamps for equality
+    return (dt - EPOCH) // MICROSECOND
+
+
+def _from_micros(value):
+    return EPOCH + value * MICROSECOND
+
+
+def encode_cursor(message_position, participant_position):
+    (message_at, message_id), (participant_at, participant_id) = message_position, participant_position
+    return f"{_to_micros(message_at)}:{message_id}:{_to_micros(participant_at)}:{participant_id}"
+
+
+def decode_cursor(cursor):
+    try:
+        message_at, message_id, participant_at, participant_id = (int(part) for part in cursor.split(":"))
+        return (_from_micros(message_at), message_id), (_from_micros(participant_at), participant_id)
+    except (AttributeError, ValueError, OverflowError):
+        raise InvalidSyncCursor(cursor)
+
+
+def _rewound_position():
+    """Start of the grace window — where a finished round resumes from"""
+    return timezone.now() - timedelta(seconds=getattr(settings, "CHAT_SYNC_GRACE_SECONDS", 10)), 0
+
+
+def current_cursor():
+    """Cursor a client stores after a full inbox load (re-reads the grace window)"""
+    position = _rewound_position()
+    return encode_cursor(position, position)
+
+
+def _after(field, position):
+    at, row_id = position
+    return Q(**{f'{field}__gt': at}) | Q(**{field: at, 'id__gt': row_id})
+
+
+def _next_position(rows, field, position, rewound=None):
+    if rows:
+        position = (getattr(rows[-1], field), rows[-1].id)
+    return min(position, rewound) if rewound else position
+
+
+def build_sync_payload(user, cursor, limit=None):
+    limit = parse_limit(limit, default=DEFAULT_SYNC_LIMIT, maximum=MAX_SYNC_LIMIT)
+    if cursor is not None and not isinstance(cursor, str):
+        # Socket payloads are arbitrary JSON
+        raise InvalidSyncCursor(cursor)
+    if not cursor or cursor.count(":") == 1:
+        # Nothing to diff against (or a pre-keyset "id:µs" cursor): client
+        # should load the inbox and keep this cursor
+        return {"reset": True, "cursor": current_cursor(), "has_more": False,
+                "messages": [], "read_states": [], "conversations": []}
+
+    message_position, participant_position = decode_cursor(cursor)
+    # Taken before querying: the round's final cursor rewinds from here
+    rewound = _rewound_position()
+    my_conversations = ConversationParticipant.objects.filter(user_id=user.id).values('conversation_id')
+
+    messages = list(
+        Message.objects.filter(_after('created_at', message_position), conversation_id__in=my_conversations)
+        .select_related('sender')
+        .order_by('created_at', 'id')[:limit + 1]
+    )
+    more_messages = len(messages) > limit
+    messages = messages[:limit]
+
+    read_states = list(
+        ConversationParticipant.objects.filter(
+            _after('updated_at', participant_position), conversation_id__in=my_conversations,
+        ).order_by('updated_at', 'id')[:limit + 1]
+    )
+    more_read_states = len(read_states) > limit
+    read_states = read_states[:limit]
+
+    has_more = more_messages or more_read_states
+    # Mid-round: continue right after the last row returned. Round done:
+    # resume from the grace window (never ahead of what was read).
+    next_messages = _next_position(messages, 'created_at', message_position, None if has_more else rewound)
+    next_read_states = _next_position(read_states, 'updated_at', participant_position, None if has_more else rewound)
+
+    changed_ids = {m.conversation_id for m in messages} | {p.conversation_id for p in read_states}
+    conversations = (
+        Conversation.objects.filter(id__in=changed_ids, participants__user_id=user.id)
+        .annotate(unread_count=F('participants__unread_count'))
+        .values('id', 'last_message', 'last_message_time', 'last_message_sender_id', 'unread_count')
+    ) if changed_ids else []
+    return {
+        "reset": False,
+        "cursor": encode_cursor(next_messages, next_read_states),
+        "has_more": has_more,
+        "messages": [
+            {
+                "id": m.id,
+                "conversation_id": m.conversation_id,
+                "sender_id": str(m.sender_id),
+                "sender_name": (m.sender.full_name or "").strip() or m.sender.email,
+                "content": m.content,
+                "attachment": attachment_payload(m),
+                "created_at": m.created_at.isoformat(),
+                "is_me": m.sender_id == user.id,
+            }
+            for m in messages
+        ],
+        "read_states": [
+            {
+                "conversation_id": p.conversation_id,
+                "user_id": str(p.user_id),
+                "last_read_at": p.last_read_at.isoformat() if p.last_read_at else None,
+                "last_read_message_id": p.last_read_message_id,
+            }
+            for p in read_states
+        ],
+        "conversations": [
+            conversation_summary(c['id'], c['last_message'], c['last_message_time'],
+                                 c['last_message_sender_id'], c['unread_count'])
+            for c in conversations
+        ],
+    }
+
+
+def conversation_summary(conversation_id, last_message, last_message_time,
+                         last_message_sender_id, unread_count):
+    """Compact inbox row — used by sync and the conversation_updated event"""
+    return {
+        "conversation_id": conversation_id,
+        "last_message": last_message,
+        "last_message_time": last_message_time.isoformat() if last_message_time else None,
+        "last_message_sender_id": str(last_message_sender_id) if last_message_sender_id else None,
+        "unread_count": unread_count,
+    }
+
+
+def _update_rows(conversation_id, user_id=None):
+    participants = ConversationParticipant.objects.filter(conversation_id=conversation_id)
+    if user_id is not None:
+        participants = participants.filter(user_id=user_id)
+    return participants.values_list(
+        'user_id', 'unread_count', 'conversation__last_message',
+        'conversation__last_message_time', 'conversation__last_message_sender_id',
+    )
+
+
+def _updates(conversation_id, rows):
+    return [
+        (uid, conversation_summary(conversation_id, last_message, last_message_time, sender_id, unread))
+        for uid, unread, last_message, last_message_time, sender_id in rows
+    ]
+
+
+def conversation_updates(conversation_id, user_id=None):
+    """
+    [(user_id, summary), ...] for every participant (or just `user_id`),
+    each with their own unread count — one query.
+    """
+    return _updates(conversation_id, _update_rows(conversation_id, user_id))
+
+
+def batch_conversation_updates(conversation_ids):
+    """{conversation_id: conversation_updates(conversation_id)} for many conversations — one query"""
+    updates = {conversation_id: [] for conversation_id in conversation_ids}
+    rows = ConversationParticipant.objects.filter(conversation_id__in=updates).values_list(
+        'conversation_id', 'user_id', 'unread_count', 'conversation__last_message',
+        'conversation__last_message_time', 'conversation__last_message_sender_id',
+    )
+    for conversation_id, *row in rows:
+        updates[conversation_id] += _updates(conversation_id, [row])
+    return updates
+
+
+async def aconversation_updates(conversation_id, user_id=None):
+    """conversation_updates for async callers (async ORM iteration)"""
+    return _updates(conversation_id, [row async for row in _update_rows(conversation_id, user_id)])
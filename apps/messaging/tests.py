@@ -0,0 +1,502 @@
+# apps/messaging/tests.py
+import asyncio
+import json
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection as db_connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.users.authentication import UserClaimsRefreshToken
+
+try:
+    import fakeredis
+except ImportError:  # optional: the Redis-backed stores are skipped without it
+    fakeredis = None
+
+from . import attachments, socket, views
+from .batching import MessageBatcher
+from .presence import InMemoryPresence, RedisPresence
+from .ratelimit import InMemoryBucketStore, RedisBucketStore, SocketRateLimiter
+from .attachments import CloudinaryAttachmentStorage, LocalAttachmentStorage, upload_prefix
+from .models import Conversation, ConversationParticipant, Message
+from .receipts import ReadReceiptBuffer, apply_read_receipts
+from .search import search_messages
+from .user_cache import ChatUser, user_cache
+from .sync import build_sync_payload
+
+User = get_user_model()
+
+
+def make_user(username, user_type='client'):
+    return User.objects.create_user(
+        username=username, email=f"{username}@example.com", password='x',
+        user_type=user_type, full_name=username.title(),
+    )
+
+
+def make_conversation(user, other, messages=0):
+    user_low_id, user_high_id = Conversation.direct_pair(user.id, other.id)
+    conversation = Conversation.objects.create(user_low_id=user_low_id, user_high_id=user_high_id)
+    ConversationParticipant.objects.bulk_create([
+        ConversationParticipant(conversation=conversation, user=user),
+        ConversationParticipant(conversation=conversation, user=other),
+    ])
+    sent = [
+        Message.objects.create(conversation=conversation, sender=other if i % 2 else user, content=f"m{i}")
+        for i in range(messages)
+    ]
+    conversation.record_messages(sent)
+    return conversation
+
+
+class MessageQueryCountTests(TestCase):
+    """Inbox and detail cost a fixed number of queries, whatever the page size"""
+
+    def setUp(self):
+        self.user = make_user('reader')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_inbox_queries_do_not_grow_with_conversations(self):
+        for count in (1, 5):
+            for i in range(count):
+                make_conversation(self.user, make_user(f"peer{count}_{i}", 'worker'), messages=2)
+            with self.assertNumQueries(2):
+                response = self.client.get(reverse('chat-list'))
+            self.assertEqual(response.status_code, 200)
+
+    def test_detail_queries_do_not_grow_with_page_size(self):
+        for limit in (1, 10, 30):
+            conversation = make_conversation(self.user, make_user(f"peer{limit}", 'worker'), messages=40)
+            url = reverse('chat-detail', args=[conversation.id])
+
+            # First open also moves the read mark (savepoint + 4 queries) and
+            # pushes the new unread count
+            with self.assertNumQueries(11):
+                response = self.client.get(url, {'limit': limit})
+            self.assertEqual(len(response.data['messages']), limit)
+            self.assertTrue(all(m['is_read'] for m in response.data['messages']))
+
+            with self.assertNumQueries(4):
+                response = self.client.get(url, {'limit': limit})
+            self.assertEqual(len(response.data['messages']), limit)
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        self.user = make_user('syncer')
+        self.peer = make_user('peer', 'worker')
+        self.conversation = make_conversation(self.user, self.peer)
+        self.cursor = build_sync_payload(self.user, None)['cursor']
+
+    def sync_all(self, limit):
+        """Pages until has_more is False; returns (message ids, read-state rows, cursor)"""
+        message_ids, read_states, cursor = [], [], self.cursor
+        while True:
+            payload = build_sync_payload(self.user, cursor, limit)
+            message_ids += [m['id'] for m in payload['messages']]
+            read_states += payload['read_states']
+            cursor = payload['cursor']
+            if not payload['has_more']:
+                return message_ids, read_states, cursor
+
+    def test_pages_through_rows_sharing_a_timestamp(self):
+        sent = [
+            Message.objects.create(conversation=self.conversation, sender=self.peer, content=f"m{i}")
+            for i in range(7)
+        ]
+        Message.objects.filter(id__in=[m.id for m in sent]).update(created_at=timezone.now())
+        for i in range(5):
+            make_conversation(self.user, make_user(f"other{i}", 'worker'))
+        # One shared timestamp for every participant row, as apply_read_receipts writes
+        ConversationParticipant.objects.update(updated_at=timezone.now())
+
+        message_ids, read_states, _ = self.sync_all(limit=2)
+        self.assertEqual(sorted(set(message_ids)), [m.id for m in sent])
+        self.assertEqual(
+            {(r['conversation_id'], r['user_id']) for r in read_states},
+            {(p.conversation_id, str(p.user_id)) for p in ConversationParticipant.objects.all()},
+        )
+
+    def test_late_commit_inside_grace_window_is_delivered(self):
+        first = Message.objects.create(conversation=self.conversation, sender=self.peer, content="first")
+        message_ids, _, cursor = self.sync_all(limit=50)
+        self.assertIn(first.id, message_ids)
+
+        # Timestamped before the sync ran, visible only now
+        late = Message.objects.create(conversation=self.conversation, sender=self.peer, content="late")
+        Message.objects.filter(id=late.id).update(created_at=first.created_at - timedelta(seconds=1))
+
+        payload = build_sync_payload(self.user, cursor, 50)
+        self.assertIn(late.id, [m['id'] for m in payload['messages']])
+
+    def test_malformed_socket_payload_is_an_error(self):
+        session = {'user': ChatUser.from_user(self.user)}
+        sync = async_to_sync(socket.sync)
+        with mock.patch.object(socket.sio, 'get_session', mock.AsyncMock(return_value=session)):
+            for data in ({'cursor': 12}, {'cursor': {'at': 1}}, {'cursor': ['1']}, ['cursor'], {'cursor': 'a:b:c:d'}):
+                self.assertEqual(sync('sid', data)['success'], False, data)
+            # Out-of-range limit falls back to the default
+            self.assertTrue(sync('sid', {'cursor': self.cursor, 'limit': float('inf')})['success'])
+
+
+class SocketTestCase(TestCase):
+    """Drives the Socket.IO handlers with in-process connections, recording what each socket receives"""
+
+    def setUp(self):
+        cache.clear()  # token revocation / stale-claims markers
+        user_cache.clear()
+        self.client_user = make_user('asker')
+        self.worker = make_user('crew', 'worker')
+        self.received = {}  # eio_sid → [event, ...]
+        self.sessions = {}
+
+        async def send_eio_packet(eio_sid, pkt):
+            self.received.setdefault(eio_sid, []).append(json.loads(pkt.data[1:])[0])
+
+        async def save_session(sid, session, namespace=None):
+            self.sessions[sid] = session
+
+        async def get_session(sid, namespace=None):
+            return self.sessions.setdefault(sid, {})
+
+        for name, replacement in (
+            ('_send_eio_packet', send_eio_packet),
+            ('save_session', save_session),
+            ('get_session', get_session),
+        ):
+            patcher = mock.patch.object(socket.sio, name, replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.tokens = {
+            user.id: str(UserClaimsRefreshToken.for_user(user).access_token)
+            for user in (self.client_user, self.worker)
+        }
+
+    async def connect(self, user, device=''):
+        eio_sid = f"eio-{user.username}{device}"
+        sid = await socket.sio.manager.connect(eio_sid, '/')
+        self.addCleanup(async_to_sync(socket.sio.manager.disconnect), sid, '/')
+        self.assertTrue(await socket.connect(sid, {}, {'token': self.tokens[user.id]}))
+        self.addCleanup(async_to_sync(socket.presence.remove), user.id, sid)
+        return sid, eio_sid
+
+
+class SocketFanOutTests(SocketTestCase):
+    def test_conversation_created_after_connect_reaches_connected_participant(self):
+        async def scenario():
+            client_sid, _ = await self.connect(self.client_user)
+            worker_sid, worker_eio = await self.connect(self.worker)
+            conversation = await database_sync_to_async(make_conversation)(self.client_user, self.worker)
+            await socket.send_message(client_sid, {'conversation_id': conversation.id, 'message': 'hi'})
+            return conversation, worker_sid, worker_eio
+
+        conversation, _, worker_eio = async_to_sync(scenario)()
+        self.assertEqual(self.received[worker_eio].count('new_message'), 1)
+
+    def test_first_direct_message_puts_live_sockets_in_the_room(self):
+        async def scenario():
+            client_sid, client_eio = await self.connect(self.client_user)
+            worker_sid, worker_eio = await self.connect(self.worker)
+            await socket.send_message(client_sid, {'to_user': self.worker.id, 'message': 'hi'})
+            return worker_sid, worker_eio
+
+        worker_sid, worker_eio = async_to_sync(scenario)()
+        conversation = Conversation.objects.get()
+        self.assertIn(socket.conversation_room(conversation.id), socket.sio.rooms(worker_sid))
+        self.assertEqual(self.received[worker_eio].count('new_message'), 1)
+
+    def test_sender_comes_from_the_session(self):
+        client_sid, _ = async_to_sync(self.connect)(self.client_user)
+        conversation = make_conversation(self.client_user, self.worker)
+        user_cache.clear()
+        with CaptureQueriesContext(db_connection) as queries:
+            async_to_sync(socket.send_message)(client_sid, {'conversation_id': conversation.id, 'message': 'hi'})
+        self.assertTrue(Message.objects.filter(sender=self.client_user).exists())
+        self.assertFalse([q['sql'] for q in queries.captured_queries if 'users_user' in q['sql']])
+
+    def test_overlong_client_msg_id_is_rejected(self):
+        async def scenario():
+            client_sid, client_eio = await self.connect(self.client_user)
+            for suffix in ('a', 'b'):
+                await socket.send_message(client_sid, {
+                    'to_user': self.worker.id, 'message': suffix, 'client_msg_id': 'x' * 64 + suffix,
+                })
+            return client_eio
+
+        client_eio = async_to_sync(scenario)()
+        self.assertEqual(self.received[client_eio], ['error', 'error'])
+        self.assertFalse(Message.objects.exists())
+
+
+class MessageBatchTests(SocketTestCase):
+    def setUp(self):
+        super().setUp()
+        self.conversation = make_conversation(self.client_user, self.worker)
+        self.client_sid, _ = async_to_sync(self.connect)(self.client_user)
+
+    def send_batch(self, client_msg_ids):
+        """Concurrent sends flushed as one batch; returns the queries they ran"""
+        async def scenario():
+            await asyncio.gather(*(
+                socket.send_message(self.client_sid, {
+                    'conversation_id': self.conversation.id, 'message': f"m{client_msg_id}",
+                    'client_msg_id': client_msg_id,
+                })
+                for client_msg_id in client_msg_ids
+            ))
+
+        batcher = MessageBatcher(max_size=len(client_msg_ids), max_delay=60)
+        with mock.patch.object(socket, 'message_batcher', batcher):
+            with CaptureQueriesContext(db_connection) as queries:
+                async_to_sync(scenario)()
+        return queries
+
+    def test_batch_queries_do_not_grow_with_its_size(self):
+        _, worker_eio = async_to_sync(self.connect)(self.worker)
+        small = self.send_batch(['a1', 'a2'])
+        large = self.send_batch([f"b{i}" for i in range(8)])
+        # Savepoint, bulk insert, summary, unread counters, inbox rows, release
+        self.assertEqual((len(small), len(large)), (6, 6))
+        self.assertEqual(self.received[worker_eio].count('new_message'), 10)
+
+        participant = ConversationParticipant.objects.get(conversation=self.conversation, user=self.worker)
+        self.assertEqual(participant.unread_count, 10)
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.last_message, 'mb7')
+
+    def test_retried_client_msg_id_resolves_to_the_original(self):
+        self.send_batch(['a', 'b', 'c'])
+        # Two retries batched with one new message
+        self.send_batch(['a', 'd', 'b'])
+        self.assertEqual(
+            sorted(Message.objects.values_list('client_msg_id', flat=True)), ['a', 'b', 'c', 'd'],
+        )
+        participant = ConversationParticipant.objects.get(conversation=self.conversation, user=self.worker)
+        self.assertEqual(participant.unread_count, 4)
+
+
+class ReadReceiptTests(TestCase):
+    def test_mark_is_clamped_to_newest_message(self):
+        user, peer = make_user('reader'), make_user('peer', 'worker')
+        conversation = make_conversation(user, peer, messages=4)
+        newest = conversation.messages.order_by('-id').first().id
+
+        apply_read_receipts({(user.id, conversation.id): 10 ** 12})
+        participant = ConversationParticipant.objects.get(user=user, conversation=conversation)
+        self.assertEqual(participant.last_read_message_id, newest)
+
+        # Later messages count as unread again
+        later = Message.objects.create(conversation=conversation, sender=peer, content="later")
+        conversation.record_messages([later])
+        participant.refresh_from_db()
+        self.assertLess(participant.last_read_message_id, later.id)
+        self.assertEqual(participant.unread_count, 1)
+
+    def test_buffer_keeps_its_flush_until_done(self):
+        user, peer = make_user('reader'), make_user('peer', 'worker')
+        conversation = make_conversation(user, peer, messages=2)
+        newest = conversation.messages.order_by('-id').first().id
+
+        async def broken_broadcast(participants):
+            raise RuntimeError("room emit failed")
+
+        async def scenario():
+            buffer = ReadReceiptBuffer(flush_delay=0, on_flushed=broken_broadcast)
+            buffer.add(user.id, conversation.id, newest)
+            buffer._flush()
+            tasks = set(buffer._tasks)
+            await asyncio.gather(*tasks)
+            return tasks, buffer._tasks
+
+        with self.assertLogs('apps.messaging.receipts', 'ERROR'):
+            in_flight, remaining = async_to_sync(scenario)()
+        self.assertEqual((len(in_flight), remaining), (1, set()))
+        participant = ConversationParticipant.objects.get(user=user, conversation=conversation)
+        self.assertEqual(participant.last_read_message_id, newest)
+
+
+class MessageSearchTests(TestCase):
+    def test_pages_across_equal_ranks(self):
+        # On Postgres the rank is ts_rank (float4), which must survive the
+        # cursor round trip; elsewhere every row ranks 0.0
+        user, peer = make_user('searcher'), make_user('peer', 'worker')
+        conversation = make_conversation(user, peer)
+        # Identical content → identical ts_rank for every row
+        sent = [
+            Message.objects.create(conversation=conversation, sender=peer, content="leaking kitchen pipe")
+            for _ in range(7)
+        ]
+
+        found, cursor = [], None
+        while True:
+            page, cursor = search_messages(user, "pipe", cursor=cursor, limit=2)
+            found += [message.id for message in page]
+            if not cursor:
+                break
+        self.assertEqual(sorted(found), [message.id for message in sent])
+
+    def test_invalid_cursor_is_a_bad_request(self):
+        client = APIClient()
+        client.force_authenticate(make_user('searcher'))
+        for cursor in ('x', 'nan:1', 'inf:1', '-Infinity:1', '1.0'):
+            response = client.get(reverse('chat-search'), {'q': 'pipe', 'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+
+
+class SocketConnectTests(SocketTestCase):
+    @override_settings(JWT_STATELESS_AUTH=True)
+    def test_cold_cache_connect_skips_users_table(self):
+        with CaptureQueriesContext(db_connection) as queries:
+            async_to_sync(self.connect)(self.worker)
+        self.assertFalse([q['sql'] for q in queries.captured_queries if 'users_user' in q['sql']])
+        self.assertEqual(user_cache.peek(self.worker.id).display_name, 'Crew')
+
+    @override_settings(JWT_STATELESS_AUTH=True)
+    def test_reconnect_after_profile_edit_uses_the_new_name(self):
+        async_to_sync(self.connect)(self.worker)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens[self.worker.id]}")
+        response = client.patch(reverse('edit-profile'), {'full_name': 'Crew Chief'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        # Same token, still carrying full_name='Crew'
+        sid, _ = async_to_sync(self.connect)(self.worker, device='-2')
+        self.assertEqual(self.sessions[sid]['user'].display_name, 'Crew Chief')
+        self.assertEqual(user_cache.peek(self.worker.id).display_name, 'Crew Chief')
+
+
+class AttachmentTests(SocketTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media = override_settings(MEDIA_ROOT=media_root.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        # CHAT_ATTACHMENT_BACKEND=local, chosen after import
+        for module in (views, attachments):
+            patcher = mock.patch.object(module, 'attachment_storage', LocalAttachmentStorage())
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_signed_local_upload(self):
+        client = APIClient()
+        client.force_authenticate(self.client_user)
+        upload = client.post(reverse('chat-attachment-sign'), {'type': 'file'}, format='json').data['upload']
+        self.assertTrue(upload['ref'].startswith(upload_prefix(self.client_user.id)))
+
+        anonymous = APIClient()
+        put = lambda url: anonymous.put(url, b'%PDF-1.4', content_type='application/octet-stream')
+        self.assertEqual(put(upload['upload_url']).status_code, 200)
+        self.assertEqual(put(upload['upload_url']).status_code, 409)
+        self.assertEqual(put(upload['upload_url'].replace(':', ':x', 1)).status_code, 403)
+
+    def test_cloudinary_params_are_signed_for_the_sender(self):
+        upload = CloudinaryAttachmentStorage().upload_params(self.worker.id, 'video')
+        self.assertTrue(upload['ref'].startswith(upload_prefix(self.worker.id)))
+        self.assertEqual(upload['fields']['public_id'], upload['ref'])
+        self.assertIn('/video/upload', upload['upload_url'])
+
+    def test_send_accepts_only_the_senders_own_refs(self):
+        own = {'ref': f"{upload_prefix(self.client_user.id)}abc", 'type': 'image'}
+        foreign = {'ref': f"{upload_prefix(self.worker.id)}abc", 'type': 'image'}
+
+        async def scenario():
+            client_sid, client_eio = await self.connect(self.client_user)
+            _, worker_eio = await self.connect(self.worker)
+            for attachment in (foreign, {**own, 'ref': own['ref'] + '/../x'}, own):
+                await socket.send_message(client_sid, {'to_user': self.worker.id, 'attachment': attachment})
+            return client_eio, worker_eio
+
+        client_eio, worker_eio = async_to_sync(scenario)()
+        self.assertEqual(self.received[client_eio].count('error'), 2)
+        self.assertEqual(self.received[worker_eio].count('new_message'), 1)
+        message = Message.objects.get()
+        self.assertEqual((message.attachment_ref, message.attachment_type, message.content), (own['ref'], 'image', ''))
+
+
+class RateLimitTests(TestCase):
+    def make_store(self):
+        return InMemoryBucketStore()
+
+    def test_rejected_event_spends_no_token(self):
+        # Per-user bucket runs out first; the shared socket keeps its token
+        limiter = SocketRateLimiter(self.make_store(), user_rate=0.001, user_burst=1, sid_rate=0.001, sid_burst=2)
+        check = async_to_sync(limiter.check)
+        self.assertEqual(check(1, 'sid'), 0)
+        self.assertGreater(check(1, 'sid'), 0)
+        self.assertEqual(check(2, 'sid'), 0)
+        self.assertGreater(check(2, 'sid'), 0)
+
+    def test_buckets_refill(self):
+        limiter = SocketRateLimiter(self.make_store(), user_rate=10, user_burst=1, sid_rate=10, sid_burst=1)
+        check = async_to_sync(limiter.check)
+        self.assertEqual(check(1, 'sid'), 0)
+        retry_after = check(1, 'sid')
+        self.assertGreater(retry_after, 0)
+        time.sleep(retry_after)
+        self.assertEqual(check(1, 'sid'), 0)
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class RedisRateLimitTests(RateLimitTests):
+    def make_store(self):
+        return RedisBucketStore(fakeredis.FakeAsyncRedis())
+
+
+class PresenceTests(TestCase):
+    def make_presence(self):
+        return InMemoryPresence()
+
+    def test_counts_every_socket_of_a_user(self):
+        presence = self.make_presence()
+
+        async def scenario():
+            await presence.add(1, 'phone')
+            await presence.add(1, 'laptop')
+            await presence.add(2, 'tablet')
+            states = [(await presence.sids(1), await presence.sids(2))]
+            last = [await presence.remove(1, 'phone')]
+            states.append((await presence.sids(1), await presence.sids(2)))
+            last.append(await presence.remove(1, 'laptop'))
+            # Unknown user or sid: nothing left either way
+            last.append(await presence.remove(1, 'laptop'))
+            states.append((await presence.sids(1), await presence.sids(2)))
+            return states, last
+
+        states, last = async_to_sync(scenario)()
+        self.assertEqual(states, [
+            ({'phone', 'laptop'}, {'tablet'}),
+            ({'laptop'}, {'tablet'}),
+            (set(), {'tablet'}),
+        ])
+        self.assertEqual(last, [False, True, True])
+
+
+@skipUnless(fakeredis, "fakeredis is not installed")
+class RedisPresenceTests(PresenceTests):
+    def make_presence(self):
+        return RedisPresence(fakeredis.FakeAsyncRedis(), ttl=60)
+
+    def test_sets_expire(self):
+        presence = self.make_presence()
+
+        async def scenario():
+            await presence.add(1, 'phone')
+            return await presence.client.ttl(presence._key(1))
+
+        self.assertTrue(0 < async_to_sync(scenario)() <= 60)
@@ -5,4 +5,8 @@ from . import views
 urlpatterns = [
     path('conversations/', views.InboxView.as_view(), name='chat-list'),
     path('conversation/<int:pk>/', views.ConversationDetailView.as_view(), name='chat-detail'),
+    path('sync/', views.SyncView.as_view(), name='chat-sync'),
+    path('search/', views.MessageSearchView.as_view(), name='chat-search'),
+    path('attachments/sign/', views.AttachmentSignView.as_view(), name='chat-attachment-sign'),
+    path('attachments/local/<str:token>/', views.LocalAttachmentUploadView.as_view(), name='chat-attachment-local-upload'),
 ]
\ No newline at end of file
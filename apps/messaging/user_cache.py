@@ -0,0 +1,99 @@
+# apps/messaging/user_cache.py
+"""
+Per-process LRU + TTL cache of the few user fields socket handlers need.
+
+Entries are dropped on profile edits (EditProfileView → invalidate) and
+expire after CHAT_USER_CACHE_TTL seconds, which bounds staleness on the
+other processes that didn't see the edit.
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+@dataclass(frozen=True, slots=True)
+class ChatUser:
+    """
+    The few user fields chat needs. Also the socket session's user record:
+    slotted, and shared with this cache, so an idle connection holds a
+    reference rather than its own User instance.
+    """
+    id: int
+    user_type: str
+    display_name: str
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(
+            id=user.id,
+            user_type=user.user_type,
+            display_name=(user.full_name or "").strip() or user.email or user.username,
+        )
+
+    @classmethod
+    def from_claims(cls, user):
+        """From a token-claims user (apps.users.authentication) — reads no deferred field"""
+        return cls(
+            id=user.id,
+            user_type=user.user_type,
+            display_name=(user.full_name or "").strip() or user.email,
+        )
+
+
+async def load_chat_user(user_id):
+    user = await (
+        User.objects.only("id", "user_type", "full_name", "email", "username")
+        .filter(id=user_id, is_active=True)
+        .afirst()
+    )
+    return ChatUser.from_user(user) if user else None
+
+
+class UserCache:
+    def __init__(self, maxsize=10000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user_id → (expires_at, ChatUser)
+
+    def put(self, record):
+        self._entries[record.id] = (time.monotonic() + self.ttl, record)
+        self._entries.move_to_end(record.id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def peek(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, record = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return record
+
+    async def get(self, user_id):
+        """Cached ChatUser, loading it on a miss. None if the user doesn't exist."""
+        record = self.peek(user_id)
+        if record is None:
+            record = await load_chat_user(user_id)
+            if record is not None:
+                self.put(record)
+        return record
+
+    def invalidate(self, user_id):
+        self._entries.pop(user_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+user_cache = UserCache(
+    maxsize=getattr(settings, "CHAT_USER_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "CHAT_USER_CACHE_TTL", 300),
+)
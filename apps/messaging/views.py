@@ -2,9 +2,18 @@
 from rest_framework import generics, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.utils import timezone
-from .models import Conversation, Message, ConversationParticipant
-from .serializers import ConversationSerializer, ConversationDetailSerializer
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.db.models import F, Prefetch
+from apps.users.search_cursor import InvalidSearchCursor
+from .attachments import ATTACHMENT_TYPES, LocalAttachmentStorage, attachment_storage
+from .models import ArchivedMessage, Conversation, Message, ConversationParticipant
+from .receipts import apply_read_receipts
+from .pagination import InvalidCursor, paginate_messages, parse_limit
+from .search import DEFAULT_RESULTS, MAX_RESULTS, search_messages
+from .serializers import ConversationSerializer, ConversationDetailSerializer, MessageSearchSerializer
+from .socket import push_conversation_update_from_sync
+from .sync import InvalidSyncCursor, build_sync_payload
 
 class InboxView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -12,22 +21,24 @@ class InboxView(generics.ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
+        # Summary + unread counter are stored on the rows, so the whole inbox
+        # is one query for conversations and one for the other participants.
         return (
             Conversation.objects.filter(participants__user=user)
-            .prefetch_related("participants__user", "messages")
-            .distinct()
+            .annotate(unread_count=F("participants__unread_count"))
+            .select_related("last_message_sender")
+            .prefetch_related(
+                Prefetch(
+                    "participants",
+                    queryset=ConversationParticipant.objects.exclude(user=user).select_related("user"),
+                    to_attr="other_participants",
+                )
+            )
+            .order_by(F("last_message_time").desc(nulls_last=True), "-created_at")
         )
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-
-        # Add unread_count dynamically
-        for conv in queryset:
-            conv.unread_count = conv.messages.filter(
-                is_read=False
-            ).exclude(sender=request.user).count()
-
-        serializer = self.get_serializer(queryset, many=True)
+        serializer = self.get_serializer(self.get_queryset(), many=True)
         return Response({"success": True, "inbox": serializer.data})
 
 
@@ -43,37 +54,147 @@ class ConversationDetailView(generics.RetrieveAPIView):
             return Response({"success": False, "error": "Conversation not found"}, status=404)
 
         # Check if user is participant
-        if not ConversationParticipant.objects.filter(
-            conversation=conversation, 
+        participant = ConversationParticipant.objects.filter(
+            conversation=conversation,
             user=request.user
-        ).exists():
+        ).first()
+        if not participant:
             return Response({"success": False, "error": "Access denied"}, status=403)
 
-        # Mark unread messages as read (except own messages)
-        Message.objects.filter(
-            conversation=conversation,
-            is_read=False
-        ).exclude(sender=request.user).update(is_read=True)
+        # Mark read up to the newest message — moves the participant's
+        # high-water mark, no per-message UPDATE
+        last_read_message_id = participant.last_read_message_id
+        newest_id = (
+            Message.objects.filter(conversation=conversation)
+            .order_by('-created_at', '-id').values_list('id', flat=True).first()
+        ) or (
+            ArchivedMessage.objects.filter(conversation=conversation)
+            .order_by('-created_at', '-id').values_list('id', flat=True).first()
+        )
+        if newest_id and (last_read_message_id or 0) < newest_id:
+            apply_read_receipts({(request.user.id, conversation.id): newest_id})
+            last_read_message_id = newest_id
 
-        # Update last_read_at
-        ConversationParticipant.objects.filter(
-            conversation=conversation,
-            user=request.user
-        ).update(last_read_at=timezone.now())
+            # Reader's other devices drop the unread badge without polling
+            if participant.unread_count:
+                push_conversation_update_from_sync(conversation.id, request.user.id)
 
-        # Get all messages
-        messages = Message.objects.filter(conversation=conversation).order_by('created_at')
+        # One page of history (keyset on created_at, id), reading through
+        # to the archive once the hot rows run out
+        messages = Message.objects.filter(conversation=conversation).select_related('sender')
+        archived = ArchivedMessage.objects.filter(conversation=conversation).select_related('sender')
+        try:
+            page, has_more = paginate_messages(
+                messages,
+                before=request.query_params.get('before'),
+                after=request.query_params.get('after'),
+                limit=parse_limit(request.query_params.get('limit')),
+                archive=archived,
+            )
+        except InvalidCursor:
+            return Response({"success": False, "error": "Invalid cursor"}, status=400)
 
-        # Serialize with is_read correctly calculated
+        # Serialize with is_read computed from the viewer's read state,
+        # loaded once for the whole page
         serializer = ConversationDetailSerializer(
-            messages, 
-            many=True, 
-            context={"request": request}
+            page,
+            many=True,
+            context={"request": request, "last_read_message_id": last_read_message_id}
         )
 
         return Response({
             "success": True,
             "conversation_id": conversation.id,
-            "messages": serializer.data
+            "messages": serializer.data,
+            "has_more": has_more,
+            "before": page[0].id if page else None,   # pass as ?before= to load older
+            "after": page[-1].id if page else None,   # pass as ?after= to load newer
         })
 
+
+
+class SyncView(APIView):
+    """What changed since ?cursor= — new messages, read states, inbox summaries"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        try:
+            payload = build_sync_payload(
+                request.user,
+                request.query_params.get('cursor'),
+                request.query_params.get('limit'),
+            )
+        except InvalidSyncCursor:
+            return Response({"success": False, "error": "Invalid cursor"}, status=400)
+        return Response({"success": True, **payload})
+
+
+class MessageSearchView(APIView):
+    """?q= across the caller's conversations (optionally ?conversation=<id>), best match first"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"success": False, "error": "q is required"}, status=400)
+
+        conversation_id = request.query_params.get('conversation')
+        if conversation_id is not None:
+            try:
+                conversation_id = int(conversation_id)
+            except ValueError:
+                return Response({"success": False, "error": "Invalid conversation"}, status=400)
+
+        try:
+            results, next_cursor = search_messages(
+                request.user,
+                query,
+                cursor=request.query_params.get('cursor'),
+                limit=parse_limit(request.query_params.get('limit'), default=DEFAULT_RESULTS, maximum=MAX_RESULTS),
+                conversation_id=conversation_id,
+            )
+        except InvalidSearchCursor:
+            return Response({"success": False, "error": "Invalid cursor"}, status=400)
+
+        serializer = MessageSearchSerializer(results, many=True, context={"request": request})
+        return Response({
+            "success": True,
+            "results": serializer.data,
+            "next_cursor": next_cursor,   # pass as ?cursor= for the next page
+        })
+
+
+class AttachmentSignView(APIView):
+    """
+    Upload parameters for one chat attachment. The client uploads the file
+    straight to `upload_url`, then sends the message with {"attachment":
+    {"ref", "type"}} — the bytes never go through this server.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        attachment_type = request.data.get('type', 'image')
+        if attachment_type not in ATTACHMENT_TYPES:
+            return Response({"success": False, "error": "Invalid attachment type"}, status=400)
+        return Response({
+            "success": True,
+            "upload": attachment_storage.upload_params(request.user.id, attachment_type),
+        })
+
+
+class LocalAttachmentUploadView(APIView):
+    """PUT target for the local storage stand-in (CHAT_ATTACHMENT_BACKEND=local)"""
+    permission_classes = [permissions.AllowAny]  # the signed token is the credential
+    authentication_classes = []
+
+    def put(self, request, token):
+        if not isinstance(attachment_storage, LocalAttachmentStorage):
+            return Response({"success": False, "error": "Not found"}, status=404)
+        try:
+            attachment = attachment_storage.read_token(token)
+        except signing.BadSignature:
+            return Response({"success": False, "error": "Upload link invalid or expired"}, status=403)
+        if attachment_storage.exists(attachment):
+            return Response({"success": False, "error": "Already uploaded"}, status=409)
+        attachment_storage.save(attachment, ContentFile(request.body))
+        return Response({"success": True, "ref": attachment.ref})
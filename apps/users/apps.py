@@ -0,0 +1,9 @@
+# apps/users/apps.py
+from django.apps import AppConfig
+
+
+class UsersConfig(AppConfig):
+    name = "apps.users"
+
+    def ready(self):
+        from . import signals  # noqa: F401
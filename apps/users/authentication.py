@@ -0,0 +1,149 @@
+# apps/users/authentication.py
+"""
+Stateless JWT authentication.
+
+Access tokens issued at login carry the user fields most requests need
+(user_type, is_active, full_name, email). StatelessJWTAuthentication builds
+the request user from those claims without touching users_user; any other
+field is loaded lazily (Django deferred field) the first time it's read, and
+save() only writes the fields that were loaded or assigned.
+
+- Tokens issued before claims existed fall back to a DB lookup whose result
+  is cached for JWT_USER_CACHE_TTL seconds.
+- Editing a claim field (e.g. full_name) marks the claims in tokens issued
+  before the edit as stale; those tokens authenticate from the row until
+  they are refreshed.
+- Deactivating or deleting a user revokes every token issued before that
+  moment (see revoke_user_tokens, wired to User post_save / post_delete in
+  apps.users.signals). Bulk `.update(is_active=False)` sends no signal —
+  call revoke_user_tokens for those ids.
+
+Revocation markers live in the default cache, so they only reach every
+process when that cache is shared. JWT_STATELESS_AUTH is therefore on by
+default only when Redis is configured; without it each request loads the
+user row, as plain simplejwt does.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+import time
+
+User = get_user_model()
+
+USER_CLAIMS = ('user_type', 'is_active', 'full_name', 'email')
+
+
+def _claims_key(user_id):
+    return f"auth:claims:{user_id}"
+
+
+def _revoked_key(user_id):
+    return f"auth:revoked:{user_id}"
+
+
+def _changed_key(user_id):
+    return f"auth:claims-changed:{user_id}"
+
+
+class UserClaimsRefreshToken(RefreshToken):
+    """RefreshToken whose access tokens carry USER_CLAIMS"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+def revoke_user_tokens(user_id):
+    """Reject every token for this user issued up to now"""
+    # Older tokens expire on their own after ACCESS_TOKEN_LIFETIME
+    ttl = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+    cache.set(_revoked_key(user_id), int(time.time()), ttl)
+    cache.delete(_claims_key(user_id))
+
+
+def forget_user_claims(user_id):
+    cache.delete(_claims_key(user_id))
+
+
+def mark_claims_changed(user_id):
+    """Claims in tokens issued up to now are stale — read them from the row instead"""
+    ttl = int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+    cache.set(_changed_key(user_id), int(time.time()), ttl)
+    cache.delete(_claims_key(user_id))
+
+
+def _load_claims(user_id):
+    """Claims for tokens that don't carry them — DB lookup with a short TTL cache"""
+    claims = cache.get(_claims_key(user_id))
+    if claims is None:
+        row = User.objects.filter(id=user_id).values(*USER_CLAIMS).first()
+        if row is None:
+            return None
+        claims = row
+        cache.set(_claims_key(user_id), claims, getattr(settings, "JWT_USER_CACHE_TTL", 60))
+    return claims
+
+
+def user_from_claims(user_id, claims):
+    """A User instance with only the claim fields loaded (the rest deferred)"""
+    loaded = {'id': user_id, **{claim: claims[claim] for claim in USER_CLAIMS}}
+    field_names, values = [], []
+    for field in User._meta.concrete_fields:
+        if field.attname in loaded:
+            field_names.append(field.attname)
+            values.append(loaded[field.attname])
+    return User.from_db(router.db_for_read(User), field_names, values)
+
+
+def get_user_for_token(validated_token):
+    try:
+        user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    if not getattr(settings, "JWT_STATELESS_AUTH", False):
+        # No shared cache for revocations — the row is the source of truth
+        user = User.objects.filter(id=user_id).first()
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
+
+    revoked_at = cache.get(_revoked_key(user_id))
+    if revoked_at is not None and validated_token.get('iat', 0) <= revoked_at:
+        raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+    changed_at = cache.get(_changed_key(user_id))
+    claims_current = changed_at is None or validated_token.get('iat', 0) > changed_at
+    if claims_current and all(claim in validated_token for claim in USER_CLAIMS):
+        claims = {claim: validated_token[claim] for claim in USER_CLAIMS}
+    else:
+        claims = _load_claims(user_id)
+        if claims is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+    if not claims['is_active']:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+    return user_from_claims(user_id, claims)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        return get_user_for_token(validated_token)
+
+
+def authenticate_token(raw_token):
+    """Validate a raw access token and return its user (used by socket connect)"""
+    auth = StatelessJWTAuthentication()
+    return get_user_for_token(auth.get_validated_token(raw_token))
@@ -0,0 +1,146 @@
+# apps/users/geo.py
+"""
+Geohash helpers for "workers near me" without PostGIS.
+
+A geohash is a base-32 string where every extra character narrows the cell,
+so all points inside a cell share its prefix. WorkerProfile stores the
+full-precision hash; a proximity search picks the cell size that covers the
+radius, takes that cell plus its 8 neighbours, and turns each prefix into a
+string range on the (profession, geohash) index. The exact great-circle
+distance is then computed in SQL for that small candidate set only.
+"""
+import math
+
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+STORED_PRECISION = 9   # ~5 m cells
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+
+def parse_coordinates(latitude, longitude):
+    """(latitude, longitude) as floats; ValueError if missing or out of range"""
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        raise ValueError("latitude and longitude must be numbers")
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("latitude/longitude out of range")
+    return latitude, longitude
+
+
+def encode(latitude, longitude, precision=STORED_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, value = (lng_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def decode(geohash):
+    """(latitude, longitude, lat_error, lng_error) — the cell's centre and half-size"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        index = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (index >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return (
+        (lat_range[0] + lat_range[1]) / 2,
+        (lng_range[0] + lng_range[1]) / 2,
+        (lat_range[1] - lat_range[0]) / 2,
+        (lng_range[1] - lng_range[0]) / 2,
+    )
+
+
+def neighbors(geohash):
+    """The cell itself plus its (up to) 8 surrounding cells at the same precision"""
+    latitude, longitude, lat_err, lng_err = decode(geohash)
+    cells = []
+    for dlat in (-1, 0, 1):
+        for dlng in (-1, 0, 1):
+            lat = latitude + dlat * 2 * lat_err
+            if not -90 <= lat <= 90:
+                continue
+            # Wrap around the antimeridian
+            lng = (longitude + dlng * 2 * lng_err + 180) % 360 - 180
+            cell = encode(lat, lng, len(geohash))
+            if cell not in cells:
+                cells.append(cell)
+    return cells
+
+
+def cell_size_km(precision, latitude):
+    """(height, width) of a cell at this precision and latitude"""
+    lat_bits = 5 * precision // 2
+    lng_bits = 5 * precision - lat_bits
+    height = 180 / 2 ** lat_bits * KM_PER_DEGREE
+    width = 360 / 2 ** lng_bits * KM_PER_DEGREE * math.cos(math.radians(latitude))
+    return height, width
+
+
+def search_precision(latitude, radius_km):
+    """Longest prefix whose cells are at least radius_km on each side (so 3x3 covers the circle)"""
+    for precision in range(STORED_PRECISION, 0, -1):
+        if min(cell_size_km(precision, latitude)) >= radius_km:
+            return precision
+    return 1
+
+
+def _prefix_upper_bound(prefix):
+    """Smallest string greater than every string starting with prefix (None if unbounded)"""
+    chars = list(prefix)
+    while chars:
+        index = BASE32.index(chars[-1])
+        if index + 1 < len(BASE32):
+            chars[-1] = BASE32[index + 1]
+            return ''.join(chars)
+        chars.pop()
+    return None
+
+
+def nearby_filter(latitude, longitude, radius_km, field='geohash'):
+    """
+    Q matching every stored geohash in the 3x3 block of cells around the
+    point — index range scans, a superset of the radius.
+    """
+    condition = Q()
+    for prefix in neighbors(encode(latitude, longitude, search_precision(latitude, radius_km))):
+        upper = _prefix_upper_bound(prefix)
+        cell = Q(**{f'{field}__gte': prefix})
+        if upper:
+            cell &= Q(**{f'{field}__lt': upper})
+        condition |= cell
+    return condition
+
+
+def distance_km(latitude, longitude, lat_field='latitude', lng_field='longitude'):
+    """Haversine distance from the point to each row, as a query expression"""
+    lat1, lng1 = math.radians(latitude), math.radians(longitude)
+    lat2, lng2 = Radians(F(lat_field)), Radians(F(lng_field))
+    half_chord = (
+        Power(Sin((lat2 - Value(lat1)) / 2), 2)
+        + Value(math.cos(lat1)) * Cos(lat2) * Power(Sin((lng2 - Value(lng1)) / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(half_chord), output_field=FloatField())
+
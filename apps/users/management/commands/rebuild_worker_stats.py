@@ -0,0 +1,52 @@
+# apps/users/management/commands/rebuild_worker_stats.py
+"""
+Recompute the stored worker aggregates from the source tables:
+
+    python manage.py rebuild_worker_stats
+
+WorkerProfile.rating / rating_sum / rating_count come from reviews on
+completed jobs, total_jobs from completed jobs. They're normally kept
+current as reviews are posted and jobs complete; run this after bulk
+imports, manual data fixes or if they ever drift.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from apps.users.models import WorkerProfile
+from apps.worker.models import Review, WorkerJob
+
+
+class Command(BaseCommand):
+    help = "Rebuild WorkerProfile rating and completed-job aggregates"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        # One grouped query per aggregate — joining reviews and jobs in a
+        # single query would multiply the counts
+        ratings = {
+            row["reviewee"]: (row["total"], row["count"])
+            for row in Review.objects.filter(job__status="completed")
+            .values("reviewee").annotate(total=Sum("rating"), count=Count("id"))
+        }
+        jobs = dict(
+            WorkerJob.objects.filter(status="completed")
+            .values("worker").annotate(count=Count("id")).values_list("worker", "count")
+        )
+
+        changed = []
+        with transaction.atomic():
+            for profile in WorkerProfile.objects.select_for_update().iterator():
+                before = (profile.rating, profile.rating_sum, profile.rating_count, profile.total_jobs)
+                profile.set_rating(*ratings.get(profile.user_id, (0, 0)))
+                profile.total_jobs = jobs.get(profile.user_id, 0)
+                if (profile.rating, profile.rating_sum, profile.rating_count, profile.total_jobs) != before:
+                    changed.append(profile)
+            WorkerProfile.objects.bulk_update(
+                changed, ["rating", "rating_sum", "rating_count", "total_jobs"],
+                batch_size=options["batch_size"],
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Updated {len(changed)} worker profiles"))
@@ -0,0 +1,54 @@
+# Generated by Django 6.0 on 2026-10-17 01:11
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_worker_stats(apps, schema_editor):
+    WorkerProfile = apps.get_model('users', 'WorkerProfile')
+    WorkerJob = apps.get_model('worker', 'WorkerJob')
+    Review = apps.get_model('worker', 'Review')
+
+    ratings = {
+        row['reviewee']: row
+        for row in Review.objects.filter(job__status='completed')
+        .values('reviewee').annotate(total=Sum('rating'), count=Count('id'))
+    }
+    jobs = dict(
+        WorkerJob.objects.filter(status='completed')
+        .values('worker').annotate(count=Count('id')).values_list('worker', 'count')
+    )
+    for profile in WorkerProfile.objects.iterator():
+        row = ratings.get(profile.user_id)
+        profile.rating_sum = row['total'] if row else 0
+        profile.rating_count = row['count'] if row else 0
+        profile.rating = (
+            (Decimal(profile.rating_sum) / profile.rating_count).quantize(Decimal('0.01'))
+            if profile.rating_count else Decimal('0')
+        )
+        profile.total_jobs = jobs.get(profile.user_id, 0)
+        profile.save(update_fields=['rating', 'rating_sum', 'rating_count', 'total_jobs'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_location_user_profile_pic'),
+        ('worker', '0009_alter_review_unique_together_alter_review_job_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workerprofile',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='workerprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_worker_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-17 01:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_worker_profile_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workerprofile',
+            index=models.Index(fields=['profession', 'rating', 'id'], name='users_worke_profess_37f38d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workerprofile',
+            index=models.Index(fields=['profession', 'hourly_rate', 'id'], name='users_worke_profess_1321a6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workerprofile',
+            index=models.Index(fields=['profession', 'experience_years', 'id'], name='users_worke_profess_56f673_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workerprofile',
+            index=models.Index(fields=['profession', 'created_at', 'id'], name='users_worke_profess_19d793_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 6.0 on 2026-10-17 01:15
+
+from django.db import migrations, models
+
+
+def backfill_search_document(apps, schema_editor):
+    WorkerProfile = apps.get_model('users', 'WorkerProfile')
+    for profile in WorkerProfile.objects.select_related('user').iterator():
+        parts = [profile.user.full_name, profile.get_profession_display(), *(profile.skills or [])]
+        profile.search_document = ' '.join(str(part).strip() for part in parts if part).lower()
+        profile.save(update_fields=['search_document'])
+
+
+# Postgres only — a trigram GIN index serves the LIKE '%term%' filters in
+# apps/client/search.py; other backends scan.
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX users_workerprofile_search_trgm "
+        "ON users_workerprofile USING gin (search_document gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS users_workerprofile_search_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_worker_profile_coordinates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workerprofile',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_document, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
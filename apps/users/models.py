@@ -1,9 +1,11 @@
 # apps/users/models.py
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from decimal import Decimal
 from django.utils import timezone
 import random
 from cloudinary.models import CloudinaryField
+from . import geo
 
 class User(AbstractUser):
     USER_TYPE_CHOICES = (
@@ -62,10 +64,78 @@ class WorkerProfile(models.Model):
     hourly_rate = models.DecimalField(max_digits=8, decimal_places=2)
     skills = models.JSONField(default=list)
     experience_years = models.PositiveIntegerField()
+    # Maintained incrementally (record_review / record_completed_job);
+    # `manage.py rebuild_worker_stats` recomputes them from scratch
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
     total_jobs = models.PositiveIntegerField(default=0)
+    # Where the worker is based; geohash is derived (set_coordinates) and
+    # indexed with profession for nearby search (apps/users/geo.py)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, default='')
+    # Lower-cased "name profession skills" for worker search (apps/client/search.py);
+    # rebuilt by save() and, on name changes, by a User post_save signal
+    search_document = models.TextField(blank=True, default='', editable=False)
     is_approved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Directory sorts — keyset pagination within a profession
+            models.Index(fields=['profession', 'rating', 'id']),
+            models.Index(fields=['profession', 'hourly_rate', 'id']),
+            models.Index(fields=['profession', 'experience_years', 'id']),
+            models.Index(fields=['profession', 'created_at', 'id']),
+            # Nearby search — geohash prefix ranges within a profession
+            models.Index(fields=['profession', 'geohash']),
+        ]
+
     def __str__(self):
-        return f"{self.user.full_name} - {self.get_profession_display()}"
\ No newline at end of file
+        return f"{self.user.full_name} - {self.get_profession_display()}"
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'profession', 'skills'} & set(update_fields):
+            self.search_document = self.build_search_document()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_document'}
+        super().save(*args, **kwargs)
+
+    def build_search_document(self, full_name=None):
+        if full_name is None:
+            full_name = self.user.full_name
+        parts = [full_name, self.get_profession_display(), *(self.skills or [])]
+        return ' '.join(str(part).strip() for part in parts if part).lower()
+
+    def set_coordinates(self, latitude, longitude):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.geohash = geo.encode(latitude, longitude) if latitude is not None else ''
+
+    def display_rating(self):
+        """Average rating rounded to one decimal, 0.0 without reviews"""
+        return round(self.rating_sum / self.rating_count, 1) if self.rating_count else 0.0
+
+    def set_rating(self, rating_sum, rating_count):
+        self.rating_sum = rating_sum
+        self.rating_count = rating_count
+        self.rating = (
+            (Decimal(rating_sum) / rating_count).quantize(Decimal('0.01'))
+            if rating_count else Decimal('0')
+        )
+
+    @classmethod
+    def record_review(cls, worker_id, rating):
+        """Fold a new review into the worker's stored rating (call inside the review's transaction)"""
+        profile = cls.objects.select_for_update().filter(user_id=worker_id).first()
+        if profile is None:
+            return
+        profile.set_rating(profile.rating_sum + rating, profile.rating_count + 1)
+        profile.save(update_fields=['rating', 'rating_sum', 'rating_count'])
+
+    @classmethod
+    def record_completed_job(cls, worker_id):
+        """Count a newly completed job (call inside the job's transaction)"""
+        cls.objects.filter(user_id=worker_id).update(total_jobs=models.F('total_jobs') + 1)
\ No newline at end of file
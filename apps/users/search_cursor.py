@@ -0,0 +1,28 @@
+# apps/users/search_cursor.py
+"""
+Keyset cursor "rank:id" for ranked search results (message search, worker
+search). The rank is written with repr() so a float8 rank reads back as
+the exact same value, and the next page's rank equality still matches.
+"""
+import math
+
+
+class InvalidSearchCursor(Exception):
+    pass
+
+
+def encode_cursor(rank, row_id):
+    return f"{rank!r}:{row_id}"
+
+
+def decode_cursor(cursor):
+    """(rank, id); InvalidSearchCursor if malformed or the rank isn't finite"""
+    try:
+        rank, row_id = cursor.split(':')
+        rank, row_id = float(rank), int(row_id)
+    except (AttributeError, ValueError):
+        raise InvalidSearchCursor(cursor)
+    # NaN compares false to everything, ±inf skips or repeats every row
+    if not math.isfinite(rank):
+        raise InvalidSearchCursor(cursor)
+    return rank, row_id
@@ -35,16 +35,25 @@ class WorkerStep1Serializer(serializers.ModelSerializer):
 
 class WorkerStep2Serializer(serializers.ModelSerializer):
     skills = serializers.ListField(child=serializers.CharField(max_length=100))
+    # Optional — lets the worker show up in nearby search
+    latitude = serializers.FloatField(required=False, min_value=-90, max_value=90)
+    longitude = serializers.FloatField(required=False, min_value=-180, max_value=180)
 
     class Meta:
         model = WorkerProfile
-        fields = ['profession', 'hourly_rate', 'skills', 'experience_years']
+        fields = ['profession', 'hourly_rate', 'skills', 'experience_years', 'latitude', 'longitude']
+
+    def validate(self, data):
+        if ('latitude' in data) != ('longitude' in data):
+            raise serializers.ValidationError("Send both latitude and longitude, or neither")
+        return data
 
     def create(self, validated_data):
-        worker_profile = WorkerProfile.objects.create(
-            user=self.context['user'],
-            **validated_data
-        )
+        latitude = validated_data.pop('latitude', None)
+        longitude = validated_data.pop('longitude', None)
+        worker_profile = WorkerProfile(user=self.context['user'], **validated_data)
+        worker_profile.set_coordinates(latitude, longitude)
+        worker_profile.save()
         # Mark user profile as complete
         self.context['user'].is_profile_complete = True
         self.context['user'].save()
@@ -0,0 +1,40 @@
+# apps/users/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .authentication import USER_CLAIMS, forget_user_claims, mark_claims_changed, revoke_user_tokens
+from .models import User, WorkerProfile
+
+
+@receiver(post_save, sender=User)
+def sync_token_state(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if not instance.is_active:
+        # Tokens carry is_active=True — revoke them instead of waiting for expiry
+        revoke_user_tokens(instance.id)
+    elif update_fields is None or set(USER_CLAIMS) & set(update_fields):
+        # e.g. a new full_name: older tokens still carry the old one
+        mark_claims_changed(instance.id)
+    else:
+        forget_user_claims(instance.id)
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    # Claims outlive the row — without this a deleted user keeps authenticating
+    revoke_user_tokens(instance.id)
+
+
+@receiver(post_save, sender=User)
+def sync_worker_search_document(sender, instance, created, update_fields=None, **kwargs):
+    # The worker's name is part of WorkerProfile.search_document
+    if created or instance.user_type != 'worker':
+        return
+    if update_fields is not None and 'full_name' not in update_fields:
+        return
+    profile = WorkerProfile.objects.filter(user_id=instance.id).first()
+    if profile is None:
+        return
+    document = profile.build_search_document(full_name=instance.full_name)
+    if document != profile.search_document:
+        WorkerProfile.objects.filter(pk=profile.pk).update(search_document=document)
@@ -0,0 +1,135 @@
+# apps/users/tests.py
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from . import geo
+from .authentication import UserClaimsRefreshToken, authenticate_token
+from .models import WorkerProfile
+
+User = get_user_model()
+
+
+class TokenAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='worker', email='worker@example.com', password='x',
+            user_type='worker', full_name='Worker One',
+        )
+        self.token = str(UserClaimsRefreshToken.for_user(self.user).access_token)
+
+    @override_settings(JWT_STATELESS_AUTH=True)
+    def test_stateless_mode_skips_the_user_row(self):
+        with self.assertNumQueries(0):
+            user = authenticate_token(self.token)
+        self.assertEqual((user.id, user.user_type, user.full_name), (self.user.id, 'worker', 'Worker One'))
+
+    @override_settings(JWT_STATELESS_AUTH=True)
+    def test_stateless_mode_rejects_deactivated_user(self):
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            authenticate_token(self.token)
+
+    @override_settings(JWT_STATELESS_AUTH=True)
+    def test_stateless_mode_rejects_deleted_user(self):
+        self.user.delete()
+        with self.assertRaises(AuthenticationFailed):
+            authenticate_token(self.token)
+
+    @override_settings(JWT_STATELESS_AUTH=True)
+    def test_stateless_mode_reads_edited_claims_from_the_row(self):
+        self.user.full_name = 'Worker Two'
+        self.user.save(update_fields=['full_name'])
+        with self.assertNumQueries(1):
+            self.assertEqual(authenticate_token(self.token).full_name, 'Worker Two')
+        # Cached until the next edit
+        with self.assertNumQueries(0):
+            authenticate_token(self.token)
+
+        # Tokens issued after the edit carry the new name again
+        with mock.patch('time.time', return_value=time.time() - 1):
+            self.user.save(update_fields=['full_name'])
+        fresh = str(UserClaimsRefreshToken.for_user(self.user).access_token)
+        with self.assertNumQueries(0):
+            self.assertEqual(authenticate_token(fresh).full_name, 'Worker Two')
+
+    @override_settings(JWT_STATELESS_AUTH=True)
+    def test_unrelated_field_update_keeps_the_claims(self):
+        self.user.location = 'Lagos'
+        self.user.save(update_fields=['location'])
+        with self.assertNumQueries(0):
+            authenticate_token(self.token)
+
+    @override_settings(JWT_STATELESS_AUTH=False)
+    def test_without_shared_cache_the_row_decides(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(authenticate_token(self.token).phone, None)
+
+        # A bulk update sends no signal — still rejected, the row is read
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        with self.assertRaises(AuthenticationFailed):
+            authenticate_token(self.token)
+
+
+class GeohashTests(TestCase):
+    def test_encode_and_decode(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744), 'u4pruydqq')
+        latitude, longitude, lat_err, lng_err = geo.decode('u4pruydqq')
+        self.assertLessEqual(abs(latitude - 57.64911), lat_err)
+        self.assertLessEqual(abs(longitude - 10.40744), lng_err)
+
+    def test_neighbors_wrap_the_antimeridian(self):
+        cells = geo.neighbors(geo.encode(0.0, 179.99, 4))
+        self.assertEqual(len(cells), 9)
+        self.assertIn(geo.encode(0.0, -179.99, 4), cells)
+
+    def test_nearby_filter_crosses_cell_edges(self):
+        # Either side of the equator and prime meridian: four different top-level cells
+        corners = [(lat, lng) for lat in (-0.01, 0.01) for lng in (-0.01, 0.01)]
+        for i, (latitude, longitude) in enumerate(corners):
+            user = User.objects.create_user(username=f"w{i}", email=f"w{i}@example.com", password='x', user_type='worker')
+            profile = WorkerProfile(user=user, profession='moving', hourly_rate=20, experience_years=1)
+            profile.set_coordinates(latitude, longitude)
+            profile.save()
+        self.assertEqual(len({geo.encode(*corner, 1) for corner in corners}), 4)
+        self.assertEqual(WorkerProfile.objects.filter(geo.nearby_filter(0.0, 0.0, 5)).count(), 4)
+
+
+class ProfileViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='client', email='client@example.com', password='x',
+            user_type='client', full_name='Client One',
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {UserClaimsRefreshToken.for_user(self.user).access_token}"
+        )
+
+    def user_row_reads(self, method, url, data=None):
+        """users_user lookups by id — authentication plus the view's own"""
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [
+            q['sql'] for q in queries.captured_queries
+            if q['sql'].startswith('SELECT') and 'FROM "users_user" WHERE "users_user"."id"' in q['sql']
+        ]
+
+    def test_user_row_is_read_once(self):
+        for stateless in (True, False):
+            with self.settings(JWT_STATELESS_AUTH=stateless):
+                self.assertEqual(len(self.user_row_reads('get', reverse('user-profile'))), 1, stateless)
+                edit = self.user_row_reads('patch', reverse('edit-profile'), {'location': 'Lagos'})
+                self.assertEqual(len(edit), 1, stateless)
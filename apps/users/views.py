@@ -8,8 +8,11 @@ from django.core.mail import send_mail
 from django.conf import settings
 from django.db.models import Count, Avg, Q
 from django.utils import timezone
+from .authentication import UserClaimsRefreshToken
+from . import geo
 from .models import WorkerProfile
 from apps.worker.models import WorkerJob, Review
+from apps.messaging.user_cache import user_cache
 from .serializers import WorkerStep1Serializer, WorkerStep2Serializer, LoginSerializer, ResetPasswordSerializer, ForgotPasswordSerializer, VerifyOtpSerializer, ClientSignupSerializer
 
 User = get_user_model()
@@ -105,7 +108,8 @@ class LoginAPIView(generics.GenericAPIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
 
-        refresh = RefreshToken.for_user(user)
+        # Access token carries user_type/is_active/name → stateless auth
+        refresh = UserClaimsRefreshToken.for_user(user)
         access_token = refresh.access_token
 
         # Detect if worker has profile
@@ -264,11 +268,23 @@ class ClientSignupView(generics.CreateAPIView):
         }, status=status.HTTP_201_CREATED)
     
 
+def full_user(request):
+    """
+    request.user with every field loaded. Under stateless auth it carries
+    only the token claims, and each other field would be its own deferred
+    query — load the row once instead. A DB-authenticated user is already
+    complete.
+    """
+    if request.user.get_deferred_fields():
+        return User.objects.get(pk=request.user.pk)
+    return request.user
+
+
 class UserProfileView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def retrieve(self, request, *args, **kwargs):
-        user = request.user
+        user = full_user(request)
 
         # BASE DATA — NOW USING REAL FIELDS
         profile_data = {
@@ -312,23 +328,20 @@ class UserProfileView(generics.RetrieveAPIView):
 
         else:  # worker
             profile = user.worker_profile
-            completed_jobs_count = WorkerJob.objects.filter(worker=user, status='completed').count()
 
             reviews_received = Review.objects.filter(
                 reviewee=user,
                 job__status='completed'
             ).select_related('reviewer').order_by('-created_at')
 
-            avg_rating = reviews_received.aggregate(avg=Avg('rating'))['avg']
-            avg_rating = round(avg_rating or 0, 1)
-
+            # Aggregates are stored on the profile
             profile_data.update({
                 "profession": profile.get_profession_display(),
                 "hourly_rate": f"${profile.hourly_rate}",
                 "experience_years": profile.experience_years,
-                "total_jobs": completed_jobs_count,
-                "rating": avg_rating,
-                "total_reviews": reviews_received.count(),
+                "total_jobs": profile.total_jobs,
+                "rating": profile.display_rating(),
+                "total_reviews": profile.rating_count,
                 "reviews": [
                     {
                         "client_name": r.reviewer.get_full_name() or r.reviewer.username,
@@ -351,23 +364,53 @@ class EditProfileView(generics.UpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def patch(self, request, *args, **kwargs):
-        user = request.user
+        # The response reads phone, location and profile_pic
+        user = full_user(request)
 
         full_name = request.data.get('full_name')
         phone = request.data.get('phone')
         location = request.data.get('location')
         profile_pic = request.FILES.get('profile_pic')
-
+        latitude = request.data.get('latitude')
+        longitude = request.data.get('longitude')
+
+        coordinates = None
+        if latitude is not None or longitude is not None:
+            if user.user_type != 'worker':
+                return Response({
+                    "success": False,
+                    "message": "Only workers have a map location"
+                }, status=400)
+            try:
+                coordinates = geo.parse_coordinates(latitude, longitude)
+            except ValueError as e:
+                return Response({"success": False, "message": str(e)}, status=400)
+
+        # Only write what changed
+        update_fields = []
         if full_name is not None:
             user.full_name = full_name.strip() or user.full_name
+            update_fields.append('full_name')
         if phone is not None:
             user.phone = phone.strip() or user.phone  # ← NOW UPDATES PHONE
+            update_fields.append('phone')
         if location is not None:
             user.location = location.strip() or user.location
+            update_fields.append('location')
         if profile_pic:
             user.profile_pic = profile_pic
-
-        user.save()
+            update_fields.append('profile_pic')
+
+        if update_fields:
+            user.save(update_fields=update_fields)
+        if coordinates:
+            latitude, longitude = coordinates
+            WorkerProfile.objects.filter(user_id=user.id).update(
+                latitude=latitude, longitude=longitude, geohash=geo.encode(latitude, longitude)
+            )
+
+        # Socket handlers cache the display name per process
+        user_cache.invalidate(user.id)
 
         return Response({
             "success": True,
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-17 01:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('worker', '0009_alter_review_unique_together_alter_review_job_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workeravailability',
+            index=models.Index(fields=['date', 'status', 'worker'], name='worker_work_date_e9e4a5_idx'),
+        ),
+    ]
@@ -23,6 +23,10 @@ class WorkerAvailability(models.Model):
     class Meta:
         unique_together = ('worker', 'date')
         ordering = ['date']
+        indexes = [
+            # Directory "free on date X" search (apps/client/availability.py)
+            models.Index(fields=['date', 'status', 'worker']),
+        ]
 
     def __str__(self):
         return f"{self.worker.email} - {self.date} ({self.get_status_display()})"
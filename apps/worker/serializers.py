@@ -40,7 +40,7 @@ class WorkerJobCardSerializer(serializers.ModelSerializer):
         return obj.time.strftime("%I:%M %p").lstrip("0")
 
     def get_location(self, obj):
-        return "America"  # or add real location later
+        return obj.client.location or "Not set"
 
 
 class WorkerAvailabilitySerializer(serializers.ModelSerializer):
@@ -3,8 +3,10 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from django.utils import timezone
 from decimal import Decimal
+from apps.users.models import WorkerProfile
 from .models import WorkerAvailability, WorkerJob, Invoice, Review
 from .serializers import (
     WorkerJobSerializer,
@@ -282,10 +284,12 @@ class CreateInvoiceView(generics.CreateAPIView):
             except:
                 pass
 
-        # Mark job as completed
-        job.status = 'completed'
-        job.completed_at = timezone.now()
-        job.save()
+        # Mark job as completed + count it on the worker's profile
+        with transaction.atomic():
+            job.status = 'completed'
+            job.completed_at = timezone.now()
+            job.save()
+            WorkerProfile.record_completed_job(job.worker_id)
 
         return Response({
             "success": True,
@@ -90,6 +90,44 @@ CHANNEL_LAYERS = {
     },
 }
 
+# -----------------------
+# REALTIME CHAT (Socket.IO)
+# -----------------------
+# Set CHAT_REDIS_URL to run several ASGI processes: Socket.IO fan-out goes
+# through Redis pub/sub and presence is shared.
+CHAT_REDIS_URL = env("CHAT_REDIS_URL", default="")
+CHAT_PRESENCE_BACKEND = env("CHAT_PRESENCE_BACKEND", default="redis" if CHAT_REDIS_URL else "memory")
+
+# Write-behind batching of chat messages: collect for up to
+# CHAT_BATCH_MAX_DELAY_MS (or CHAT_BATCH_MAX_SIZE messages), then one
+# bulk insert + summary update per batch.
+CHAT_BATCH_WRITES = env.bool("CHAT_BATCH_WRITES", default=False)
+CHAT_BATCH_MAX_SIZE = env.int("CHAT_BATCH_MAX_SIZE", default=100)
+CHAT_BATCH_MAX_DELAY_MS = env.int("CHAT_BATCH_MAX_DELAY_MS", default=5)
+
+# Per-process cache of lightweight user records used by socket handlers
+CHAT_USER_CACHE_SIZE = env.int("CHAT_USER_CACHE_SIZE", default=10000)
+CHAT_USER_CACHE_TTL = env.int("CHAT_USER_CACHE_TTL", default=300)
+
+# Token-bucket limits on socket events, per user (all devices) and per sid
+CHAT_RATE_LIMIT = env.bool("CHAT_RATE_LIMIT", default=True)
+CHAT_RATE_LIMIT_BACKEND = env("CHAT_RATE_LIMIT_BACKEND", default="redis" if CHAT_REDIS_URL else "memory")
+CHAT_RATE_USER_PER_SEC = env.float("CHAT_RATE_USER_PER_SEC", default=10.0)
+CHAT_RATE_USER_BURST = env.int("CHAT_RATE_USER_BURST", default=30)
+CHAT_RATE_SID_PER_SEC = env.float("CHAT_RATE_SID_PER_SEC", default=5.0)
+CHAT_RATE_SID_BURST = env.int("CHAT_RATE_SID_BURST", default=20)
+
+# mark_read receipts are coalesced per (user, conversation) for this long
+CHAT_READ_FLUSH_MS = env.int("CHAT_READ_FLUSH_MS", default=500)
+
+# Delta sync re-reads this window so rows committed after a sync read past
+# their (pre-commit) timestamp are still delivered
+CHAT_SYNC_GRACE_SECONDS = env.int("CHAT_SYNC_GRACE_SECONDS", default=10)
+
+# Where chat attachments are uploaded: "cloudinary" (signed direct uploads)
+# or "local" (default storage, for dev/tests)
+CHAT_ATTACHMENT_BACKEND = env("CHAT_ATTACHMENT_BACKEND", default="cloudinary")
+
 
 # -----------------------
 # MIDDLEWARE
@@ -138,17 +176,19 @@ WSGI_APPLICATION = "config.wsgi.application"
 # -----------------------
 # DATABASE
 # -----------------------
+DB_ENGINE = env("DB_ENGINE", default="django.db.backends.postgresql")
 DATABASES = {
     "default": {
-        "ENGINE": env("DB_ENGINE", default="django.db.backends.postgresql"),
+        "ENGINE": DB_ENGINE,
         "NAME": env("DB_NAME"),
-        "USER": env("DB_USER"),
-        "PASSWORD": env("DB_PASSWORD"),
-        "HOST": env("DB_HOST"),
-        "PORT": env("DB_PORT"),
+        "USER": env("DB_USER", default=""),
+        "PASSWORD": env("DB_PASSWORD", default=""),
+        "HOST": env("DB_HOST", default=""),
+        "PORT": env("DB_PORT", default=""),
+        # search_path is Postgres-only; SQLite (local benchmarks) takes no options
         "OPTIONS": {
-            "options": "-c search_path=chefven" 
-        },
+            "options": "-c search_path=chefven"
+        } if DB_ENGINE.endswith("postgresql") else {},
     }
 }
 
@@ -189,7 +229,7 @@ STATIC_URL = "/static/"
 # -----------------------
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.users.authentication.StatelessJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -207,6 +247,26 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# Tokens without user claims (issued before they existed) are resolved from
+# the DB and cached for this many seconds
+JWT_USER_CACHE_TTL = env.int("JWT_USER_CACHE_TTL", default=60)
+
+# Authenticate from token claims alone (no users_user lookup per request).
+# Revocations are cache markers, so this needs a cache every process shares;
+# without Redis it defaults off and each request loads the user row.
+JWT_STATELESS_AUTH = env.bool("JWT_STATELESS_AUTH", default=bool(CHAT_REDIS_URL))
+
+# -----------------------
+# CACHE (token revocation + claim cache; shared when Redis is configured)
+# -----------------------
+CACHES = {
+    "default": (
+        {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": env("CHAT_REDIS_URL")}
+        if env("CHAT_REDIS_URL", default="") else
+        {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    ),
+}
+
 # -----------------------
 # AUTO FIELD
 # -----------------------
@@ -282,7 +342,7 @@ LOGGING = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',